@@ -0,0 +1,6 @@
+"""
+* modul yang dipakai bersama oleh tugas-2, tugas-4 dan tugas-ets (satu salinan saja):
+access_log, profiling_hook, microbenchmark, socket_buffers;
+setiap direktori tugas punya modul kecil dengan nama yang sama yang hanya
+menambahkan root repository ke sys.path lalu meneruskan import dari sini
+"""
@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+import logging.handlers
+
+"""
+* access log terstruktur (satu baris JSON per event) yang tidak memblokir worker:
+thread yang melayani request hanya membuat LogRecord dan memasukkannya ke queue
+(QueueHandler), format JSON dan write ke stderr/file dikerjakan thread writer
+di belakang (QueueListener)
+
+* verbosity (--log-level):
+    off     tidak ada log
+    error   hanya error (koneksi gagal, request ditolak, exception handler)
+    access  satu baris per request + error (default)
+    debug   semua, termasuk buka/tutup koneksi dan potongan payload request
+
+* --log-sample R mencatat hanya sebagian R (0..1) dari baris access, error dan request
+yang gagal (HTTP 5xx, status ERROR) selalu dicatat
+
+* payload dan string panjang lain dipotong menjadi --log-payload karakter sebelum
+masuk queue, sehingga request upload berukuran MB tidak pernah disalin ke log
+
+* writer di-start saat pertama kali dipakai, termasuk di worker hasil fork
+(thread writer parent tidak ikut ter-fork)
+"""
+
+LEVELS = {
+    'off': logging.CRITICAL + 10,
+    'error': logging.ERROR,
+    'access': logging.INFO,
+    'debug': logging.DEBUG,
+}
+DEFAULT_LEVEL = 'access'
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_MAX_PAYLOAD = 256
+
+
+class UnformattedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the writer thread"""
+
+    def prepare(self, record):
+        return record
+
+
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                    + f".{int(record.msecs):03d}",
+            'level': record.levelname.lower(),
+            'event': record.msg,
+        }
+        entry.update(record.fields)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class AccessLog:
+    def __init__(self, level=DEFAULT_LEVEL, sample_rate=DEFAULT_SAMPLE_RATE, max_payload=DEFAULT_MAX_PAYLOAD,
+                 path=None):
+        self.lock = threading.Lock()
+        self.listener = None
+        self.handler = None
+        self.configure(level, sample_rate, max_payload, path)
+        os.register_at_fork(after_in_child=self.reset_after_fork)
+        atexit.register(self.stop)
+
+    def configure(self, level=DEFAULT_LEVEL, sample_rate=DEFAULT_SAMPLE_RATE, max_payload=DEFAULT_MAX_PAYLOAD,
+                  path=None):
+        self.stop()
+        self.level = LEVELS[level]
+        self.sample_rate = sample_rate
+        self.max_payload = max_payload
+        self.path = path
+
+    def add_arguments(self, parser):
+        """Register --log-level/--log-sample/--log-payload/--access-log on an argparse parser"""
+        parser.add_argument('--log-level', choices=list(LEVELS), default=DEFAULT_LEVEL,
+                            help=f'Access log verbosity (default: {DEFAULT_LEVEL})')
+        parser.add_argument('--log-sample', type=float, default=DEFAULT_SAMPLE_RATE,
+                            help='Fraction of access lines to keep, errors are always kept (default: 1.0)')
+        parser.add_argument('--log-payload', type=int, default=DEFAULT_MAX_PAYLOAD,
+                            help=f'Truncate logged payloads to N characters (default: {DEFAULT_MAX_PAYLOAD})')
+        parser.add_argument('--access-log', default=None, help='Write the access log to FILE instead of stderr')
+
+    def configure_from_args(self, args):
+        self.configure(args.log_level, args.log_sample, args.log_payload, args.access_log)
+
+    def settings(self):
+        """Positional arguments for configure(), e.g. initargs of a process pool"""
+        level = next(name for name, value in LEVELS.items() if value == self.level)
+        return (level, self.sample_rate, self.max_payload, self.path)
+
+    def start(self):
+        with self.lock:
+            if self.handler is not None:
+                return
+            if self.path:
+                output = logging.FileHandler(self.path)
+            else:
+                output = logging.StreamHandler(sys.stderr)
+            output.setFormatter(JsonLineFormatter())
+            log_queue = queue.SimpleQueue()
+            self.listener = logging.handlers.QueueListener(log_queue, output)
+            self.listener.start()
+            self.handler = UnformattedQueueHandler(log_queue)
+
+    def stop(self):
+        """Flush queued records and stop the writer thread"""
+        with self.lock:
+            listener, self.listener, self.handler = self.listener, None, None
+        if listener is not None:
+            listener.stop()
+            for output in listener.handlers:
+                output.close()
+
+    def reset_after_fork(self):
+        # thread writer tidak ikut ter-fork, worker membuat writer sendiri saat pertama kali log
+        self.lock = threading.Lock()
+        self.listener = None
+        self.handler = None
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def truncate(self, value):
+        """Shorten long strings/bytes for logging, noting how much was cut"""
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = bytes(value[:self.max_payload + 1]).decode('utf-8', errors='replace')
+        elif not isinstance(value, str):
+            return value
+        if len(value) > self.max_payload:
+            return f"{value[:self.max_payload]}...({len(value)} chars)"
+        return value
+
+    def log(self, level, event, fields):
+        if level < self.level:
+            return
+        handler = self.handler
+        if handler is None:
+            self.start()
+            handler = self.handler
+        for key, value in fields.items():
+            if isinstance(value, (str, bytes, bytearray, memoryview)) and len(value) > self.max_payload:
+                fields[key] = self.truncate(value)
+        record = logging.makeLogRecord({'msg': event, 'levelno': level,
+                                        'levelname': logging.getLevelName(level), 'fields': fields})
+        handler.handle(record)
+
+    def request(self, **fields):
+        """One access line per request, subject to sampling unless the request failed"""
+        if logging.INFO < self.level:
+            return
+        if self.sample_rate < 1.0 and not failed(fields.get('status')) and random.random() >= self.sample_rate:
+            return
+        self.log(logging.INFO, 'request', fields)
+
+    def info(self, event, **fields):
+        self.log(logging.INFO, event, fields)
+
+    def debug(self, event, **fields):
+        self.log(logging.DEBUG, event, fields)
+
+    def error(self, event, **fields):
+        self.log(logging.ERROR, event, fields)
+
+
+def failed(status):
+    """HTTP 5xx or a file protocol ERROR status"""
+    return status == 'ERROR' or (isinstance(status, int) and status >= 500)
+
+
+access_logger = AccessLog()
@@ -0,0 +1,97 @@
+import gc
+import time
+import statistics
+import tracemalloc
+
+"""
+* fungsi pengukuran yang dipakai bersama oleh tugas-4/http_microbenchmark.py dan
+tugas-ets/file_microbenchmark.py
+
+* measure: warmup, lalu diukur berulang kali (ns/op = median dari beberapa repeat),
+alokasi per operasi diukur terpisah dengan tracemalloc (peak bytes selama satu operasi)
+
+* compare_with_baseline: membandingkan hasil dengan baseline JSON dan mengembalikan
+daftar benchmark yang regresi di atas threshold (persen)
+"""
+
+
+def format_size(size):
+    if size >= 1024 * 1024:
+        return f"{size // (1024 * 1024)}MB"
+    return f"{size // 1024}KB"
+
+
+def measure(operation, setup=None, min_time=0.2, repeat=5, warmup=1):
+    """Time one operation, setup (if any) runs before every call and is not timed"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        operation()
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if setup:
+            # per-call timing so the setup stays outside the measurement
+            samples = []
+            deadline = time.perf_counter() + min_time * repeat
+            while len(samples) < repeat or time.perf_counter() < deadline:
+                setup()
+                start = time.perf_counter_ns()
+                operation()
+                samples.append(time.perf_counter_ns() - start)
+            loops = len(samples)
+        else:
+            loops = 1
+            while True:
+                start = time.perf_counter_ns()
+                for _ in range(loops):
+                    operation()
+                elapsed = time.perf_counter_ns() - start
+                if elapsed >= min_time * 1e9 or loops >= 1 << 20:
+                    break
+                loops *= 2
+
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter_ns()
+                for _ in range(loops):
+                    operation()
+                samples.append((time.perf_counter_ns() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ns_per_op': statistics.median(samples),
+        'min_ns_per_op': min(samples),
+        'bytes_per_op': peak - baseline,
+        'loops': loops,
+    }
+
+
+def compare_with_baseline(results, baseline, threshold):
+    regressions = []
+    print(f"{'benchmark':40} {'ns/op':>14} {'baseline':>14} {'delta':>8} {'bytes/op':>12} {'baseline':>12}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            print(f"{name:40} {result['ns_per_op']:14.0f} {'-':>14} {'new':>8} {result['bytes_per_op']:12d} {'-':>12}")
+            continue
+        delta = (result['ns_per_op'] - previous['ns_per_op']) / previous['ns_per_op'] * 100
+        marker = ''
+        if delta > threshold or result['bytes_per_op'] > previous['bytes_per_op'] * (1 + threshold / 100):
+            marker = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:40} {result['ns_per_op']:14.0f} {previous['ns_per_op']:14.0f} {delta:7.1f}% "
+              f"{result['bytes_per_op']:12d} {previous['bytes_per_op']:12d}{marker}")
+    return regressions
@@ -0,0 +1,176 @@
+import os
+import time
+import signal
+import logging
+import threading
+import cProfile
+import pstats
+import tracemalloc
+
+"""
+* ProfilingHook memungkinkan profiling server yang sedang berjalan tanpa restart
+
+* SIGUSR1 -> mulai/berhenti capture cProfile di semua worker thread
+* SIGUSR2 -> mulai/berhenti capture tracemalloc (snapshot diambil saat berhenti)
+
+* capture berhenti otomatis setelah N detik atau N request, hasilnya ditulis ke
+output_dir sebagai <nama>-<pid>-<waktu>.prof atau .snapshot
+
+* pemanggil cukup mengecek atribut `active` sebelum memanggil run(), sehingga
+saat hook tidak aktif tidak ada overhead di jalur request
+"""
+
+
+class ProfilingHook:
+    def __init__(self, name='server', output_dir='profiles', duration=30, max_requests=None):
+        self.name = name
+        self.output_dir = output_dir
+        self.duration = duration
+        self.max_requests = max_requests
+        self.active = None  # None, 'cpu' atau 'memory'
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profilers = []
+        self.in_flight = 0
+        self.remaining_requests = None
+        self.timer = None
+        self.owner_pid = os.getpid()
+        self.forward_to = None
+
+    def install(self, forward_to=None):
+        """Register the signal handlers, must be called from the main thread.
+
+        forward_to is an optional callable returning child pids (process pool workers)
+        that should receive the same signal.
+        """
+        self.owner_pid = os.getpid()
+        self.forward_to = forward_to
+        os.register_at_fork(after_in_child=self.reset_after_fork)
+        signal.signal(signal.SIGUSR1, self.handle_signal)
+        signal.signal(signal.SIGUSR2, self.handle_signal)
+        logging.warning(f"profiling hook ready (pid {self.owner_pid}): SIGUSR1 = cProfile, SIGUSR2 = tracemalloc, "
+                        f"output in {os.path.abspath(self.output_dir)}")
+
+    def reset_after_fork(self):
+        # worker yang di-fork saat capture aktif ikut capture dengan sisa waktunya sendiri
+        mode = self.active
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profilers = []
+        self.in_flight = 0
+        self.timer = None
+        self.active = None
+        if mode:
+            remaining = round(self.duration - (time.time() - self.started_at), 1) if self.duration else 0
+            if not self.duration or remaining > 0:
+                self.start(mode, duration=remaining, max_requests=self.remaining_requests)
+            elif mode == 'memory':
+                tracemalloc.stop()
+
+    def handle_signal(self, signum, frame):
+        mode = 'cpu' if signum == signal.SIGUSR1 else 'memory'
+        # forked workers inherit this handler, only the original process forwards the signal
+        if self.forward_to and os.getpid() == self.owner_pid:
+            for pid in list(self.forward_to()):
+                try:
+                    os.kill(pid, signum)
+                except OSError:
+                    pass
+        # jangan menulis file di dalam signal handler yang mungkin menginterupsi request
+        threading.Thread(target=self.toggle, args=(mode,), daemon=True).start()
+
+    def toggle(self, mode):
+        if self.active == mode:
+            self.stop()
+        elif not self.active:
+            self.start(mode)
+
+    def start(self, mode, duration=None, max_requests=None):
+        with self.lock:
+            if self.active:
+                return False
+            duration = duration if duration is not None else self.duration
+            max_requests = max_requests if max_requests is not None else self.max_requests
+            self.profilers = []
+            self.local = threading.local()
+            self.remaining_requests = max_requests
+            self.started_at = time.time()
+            if mode == 'memory':
+                tracemalloc.start()
+            self.active = mode
+
+        if duration:
+            self.timer = threading.Timer(duration, self.stop)
+            self.timer.daemon = True
+            self.timer.start()
+        logging.warning(f"profiling ({mode}) started in pid {os.getpid()}, "
+                        f"duration {duration or '-'}s, max requests {max_requests or '-'}")
+        return True
+
+    def run(self, func, *args, **kwargs):
+        """Run one request under the active capture"""
+        mode = self.active
+        if not mode:
+            return func(*args, **kwargs)
+
+        with self.lock:
+            self.in_flight += 1
+        try:
+            if mode == 'cpu':
+                profiler = getattr(self.local, 'profiler', None)
+                if profiler is None:
+                    profiler = self.local.profiler = cProfile.Profile()
+                    with self.lock:
+                        self.profilers.append(profiler)
+                profiler.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profiler.disable()
+            return func(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                if self.remaining_requests is not None:
+                    self.remaining_requests -= 1
+                    limit_reached = self.remaining_requests == 0
+                else:
+                    limit_reached = False
+            if limit_reached:
+                threading.Thread(target=self.stop, daemon=True).start()
+
+    def stop(self):
+        with self.lock:
+            mode = self.active
+            if not mode:
+                return None
+            self.active = None
+            profilers = self.profilers
+            self.profilers = []
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+        # tunggu request yang sedang diprofile selesai supaya statistiknya lengkap
+        deadline = time.time() + 5
+        while self.in_flight and time.time() < deadline:
+            time.sleep(0.01)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = time.strftime('%Y%m%d-%H%M%S')
+        if mode == 'cpu':
+            output_file = os.path.join(self.output_dir, f"{self.name}-{os.getpid()}-{timestamp}.prof")
+            if not profilers:
+                logging.warning(f"profiling (cpu) stopped in pid {os.getpid()}, no requests were captured")
+                return None
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(output_file)
+        else:
+            output_file = os.path.join(self.output_dir, f"{self.name}-{os.getpid()}-{timestamp}.snapshot")
+            tracemalloc.take_snapshot().dump(output_file)
+            tracemalloc.stop()
+
+        logging.warning(f"profiling ({mode}) stopped after {time.time() - self.started_at:.1f}s, written to {output_file}")
+        return output_file
@@ -0,0 +1,28 @@
+"""
+* send_buffers menulis daftar buffer (header, body, terminator, ...) ke socket dengan
+satu socket.sendmsg per putaran (scatter/gather), tanpa menggabungkan buffer terlebih dulu
+
+* dipakai send path tugas-4 (http_connection) dan server file tugas-ets
+"""
+
+# batas jumlah iovec per sendmsg (IOV_MAX Linux)
+SENDMSG_MAX_BUFFERS = 1024
+
+
+def send_buffers(connection, buffers):
+    """Scatter/gather write of all buffers with sendmsg, resuming after partial writes
+
+    Returns the number of bytes written."""
+    buffers = [buffer if isinstance(buffer, memoryview) else memoryview(buffer) for buffer in buffers if buffer]
+    total = 0
+    index = 0
+    while index < len(buffers):
+        sent = connection.sendmsg(buffers[index:index + SENDMSG_MAX_BUFFERS])
+        total += sent
+        # buffer yang sudah terkirim penuh dilewati, sisa buffer yang terkirim sebagian dipotong (tanpa copy)
+        while index < len(buffers) and sent >= len(buffers[index]):
+            sent -= len(buffers[index])
+            index += 1
+        if sent:
+            buffers[index] = buffers[index][sent:]
+    return total
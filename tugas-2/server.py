@@ -2,7 +2,10 @@ from socket import *
 import socket
 import threading
 import logging
+import argparse
+import time
 from datetime import datetime
+from access_log import access_logger
 
 logging.basicConfig(
     format='[%(asctime)s] %(message)s',
@@ -17,34 +20,36 @@ class ProcessTheClient(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
-        logging.warning(f"[SERVER] Terhubung dengan {self.address}")
+        access_logger.debug('connection opened', client=self.address)
         try:
             while True:
                 data = self.connection.recv(256)
                 if not data:
                     break
 
+                started = time.perf_counter()
                 text = data.decode().strip()
-                logging.warning(f"[SERVER] Data diterima dari {self.address}: {text}")
 
                 if text.upper() == "TIME":
                     now = datetime.now()
                     jam = now.strftime("%H:%M:%S")
                     msg = f"JAM {jam}\r\n"
                     self.connection.sendall(msg.encode())
-                    logging.warning(f"[SERVER] Mengirim waktu ke {self.address}: {msg.strip()}")
+                    status = 'OK'
                 elif text.upper() == "QUIT":
-                    logging.warning(f"[SERVER] {self.address} meminta keluar.")
+                    access_logger.request(client=self.address, command=text, status='QUIT')
                     break
                 else:
-                    err = "PERINTAH TIDAK VALID\r\n"
-                    self.connection.sendall(err.encode())
-                    logging.warning(f"[SERVER] Perintah tidak dikenal dari {self.address}: {text}")
+                    msg = "PERINTAH TIDAK VALID\r\n"
+                    self.connection.sendall(msg.encode())
+                    status = 'INVALID'
+                access_logger.request(client=self.address, command=text, status=status, response=msg.strip(),
+                                      duration_ms=round((time.perf_counter() - started) * 1000, 3))
         except Exception as e:
-            logging.error(f"[SERVER] Error dengan {self.address}: {e}")
+            access_logger.error('connection failed', client=self.address, error=str(e))
         finally:
             self.connection.close()
-            logging.warning(f"[SERVER] Koneksi ditutup dengan {self.address}\n")
+            access_logger.debug('connection closed', client=self.address)
 
 class Server(threading.Thread):
     def __init__(self):
@@ -60,13 +65,15 @@ class Server(threading.Thread):
         logging.warning(f"SERVER LISTENING ON {host}:{port}") # Tambahan pesan ini
         while True:
             self.connection, self.client_address = self.my_socket.accept()
-            logging.warning(f"connection from {self.client_address}")
 
             clt = ProcessTheClient(self.connection, self.client_address)
             clt.start()
             self.the_clients.append(clt)
 
 def main():
+    cmd_parser = argparse.ArgumentParser(description='Time Server')
+    access_logger.add_arguments(cmd_parser)
+    access_logger.configure_from_args(cmd_parser.parse_args())
     svr = Server()
     svr.start()
 
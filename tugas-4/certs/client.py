@@ -0,0 +1,121 @@
+import sys
+import os
+import argparse
+
+from http_client import HttpClient, HttpClientError, DEFAULT_WORKERS
+
+HOST = 'localhost'
+# thread pool 8885, process pool 8889, asyncio 8887
+PORT = 8885
+
+client = None
+
+def print_response(response):
+    print(f"HTTP {response.status} {response.reason}")
+    print(response.text().strip())
+
+def list_files():
+    # /list?format=json dibaca per halaman (cursor), tidak terpotong di 4096 byte pertama
+    files = client.list_files()
+    for entry in files:
+        print(f"{entry['name']}\t{entry['size']}")
+    print(f"[{len(files)} file]")
+
+def upload_file(file_path):
+    if not os.path.exists(file_path):
+        print("File tidak ditemukan.")
+        return
+
+    try:
+        response = client.upload_file(file_path)
+    except (OSError, HttpClientError) as e:
+        print(f"Gagal terhubung ke server di port {PORT}: {e}")
+        return
+    print(f"[Sukses upload ke port {PORT}]")
+    print_response(response)
+
+def download_file(filename, dest_path=None):
+    dest_path = dest_path or os.path.basename(filename)
+    response = client.download_file(filename, dest_path)
+    if response.status == 200:
+        print(f"[Sukses download {filename} -> {dest_path}, {os.path.getsize(dest_path)} byte]")
+    else:
+        print_response(response)
+
+def delete_file(filename):
+    print_response(client.delete_file(filename))
+
+def print_bulk_result(result):
+    print(result)
+    for name, error in result.failed:
+        print(f"  gagal {name}: {error}")
+
+def upload_dir(directory, workers):
+    if not os.path.isdir(directory):
+        print("Direktori tidak ditemukan.")
+        return
+    print_bulk_result(client.upload_directory(directory, workers))
+
+def download_dir(directory, workers):
+    print_bulk_result(client.download_directory(directory, workers=workers))
+
+def show_usage():
+    print("Usage: python3 client.py [--host HOST] [--port PORT] <command> ...")
+    print("  python3 client.py list")
+    print("  python3 client.py upload <filepath>")
+    print("  python3 client.py download <filename> [dest_path]")
+    print("  python3 client.py delete <filename>")
+    print(f"  python3 client.py upload-dir <directory> [workers, default {DEFAULT_WORKERS}]")
+    print(f"  python3 client.py download-dir <directory> [workers, default {DEFAULT_WORKERS}]")
+    print(f"  --port: thread pool 8885, process pool 8889, asyncio 8887 (default: {PORT})")
+
+def main():
+    global client, HOST, PORT
+    cmd_parser = argparse.ArgumentParser(add_help=False)
+    cmd_parser.add_argument('--host', default=HOST)
+    cmd_parser.add_argument('--port', type=int, default=PORT)
+    cmd_args, argv = cmd_parser.parse_known_args()
+    HOST = cmd_args.host
+    PORT = cmd_args.port
+    client = HttpClient(HOST, PORT)
+
+    if len(argv) < 1:
+        print("Error: Tidak ada command yang diberikan!")
+        show_usage()
+        sys.exit(1)
+
+    command = argv[0]
+
+    try:
+        if command == 'list':
+            list_files()
+        elif command in ('upload', 'download', 'delete', 'upload-dir', 'download-dir'):
+            if len(argv) < 2:
+                print("Error: Argumen tidak diberikan!")
+                show_usage()
+                sys.exit(1)
+            argument = argv[1]
+            if command == 'upload':
+                upload_file(argument)
+            elif command == 'download':
+                download_file(argument, argv[2] if len(argv) > 2 else None)
+            elif command == 'delete':
+                delete_file(argument)
+            else:
+                workers = int(argv[2]) if len(argv) > 2 else DEFAULT_WORKERS
+                if command == 'upload-dir':
+                    upload_dir(argument, workers)
+                else:
+                    download_dir(argument, workers)
+        else:
+            print(f"Error: Command '{command}' tidak dikenal!")
+            show_usage()
+            sys.exit(1)
+    except (OSError, HttpClientError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
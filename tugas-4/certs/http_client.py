@@ -0,0 +1,471 @@
+import os
+import json
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlencode
+
+"""
+* client HTTP yang bisa dipakai ulang untuk server tugas-4 (thread pool 8885,
+process pool 8889, asyncio 8887), dipakai oleh client.py (server dipilih dengan --port)
+
+* koneksi HTTP/1.1 keep-alive disimpan di ConnectionPool per host:port dan dipakai
+ulang antar request (juga antar thread), koneksi idle yang mungkin sudah ditutup
+server dibuang, request yang gagal di koneksi lama diulang sekali di koneksi baru
+
+* response selalu dibaca lengkap: Content-Length, Transfer-Encoding: chunked, atau
+sampai koneksi ditutup; body bisa ditulis langsung ke file (sink) tanpa ditampung
+
+* body upload bisa berupa bytes atau file object: file dikirim dengan sendfile
+(atau per blok), tidak pernah dibaca seluruhnya ke memori
+
+* upload_directory / download_directory memindahkan satu direktori secara paralel
+dengan jumlah worker terbatas dan melaporkan throughput gabungan (BulkResult)
+"""
+
+DEFAULT_TIMEOUT = 30.0
+RECV_SIZE = 65536
+SEND_CHUNK_SIZE = 1024 * 1024
+MAX_HEADER_SIZE = 64 * 1024
+MAX_IDLE_PER_HOST = 16
+# lebih pendek dari keep-alive timeout server (5 detik) supaya koneksi yang dipakai ulang belum ditutup
+IDLE_TIMEOUT = 4.0
+LIST_PAGE_SIZE = 1000
+DEFAULT_WORKERS = 8
+# request yang aman diulang walaupun server mungkin sudah memprosesnya
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+
+class HttpClientError(Exception):
+    """Response yang tidak valid, atau koneksi terputus di tengah response"""
+
+
+class ClientResponse:
+    def __init__(self, status, reason, headers, body=b""):
+        self.status = status
+        self.reason = reason
+        self.headers = headers  # nama header lowercase
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Connection:
+    """Satu socket ke server beserta buffer baca"""
+
+    def __init__(self, host, port, timeout=DEFAULT_TIMEOUT):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray()
+        self.reused = False
+        # byte response request saat ini yang sudah diterima; request hanya boleh diulang selama masih 0
+        self.bytes_received = 0
+        self.released_at = 0.0
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def fill(self):
+        data = self.sock.recv(RECV_SIZE)
+        if not data:
+            raise ConnectionError("Connection closed by server")
+        self.bytes_received += len(data)
+        self.buffer += data
+
+    def read_line(self, limit=MAX_HEADER_SIZE):
+        while True:
+            end = self.buffer.find(b"\r\n")
+            if end >= 0:
+                line = bytes(self.buffer[:end])
+                del self.buffer[:end + 2]
+                return line
+            if len(self.buffer) > limit:
+                raise HttpClientError("Response line too long")
+            self.fill()
+
+    def read_head(self):
+        while True:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end >= 0:
+                head = bytes(self.buffer[:end])
+                del self.buffer[:end + 4]
+                return head
+            if len(self.buffer) > MAX_HEADER_SIZE:
+                raise HttpClientError("Response header too large")
+            self.fill()
+
+    def read_exact(self, size, write):
+        """Pass exactly size body bytes to write()"""
+        while size > 0:
+            if not self.buffer:
+                self.fill()
+            n = min(size, len(self.buffer))
+            write(bytes(self.buffer[:n]))
+            del self.buffer[:n]
+            size -= n
+
+    def read_chunked(self, write):
+        while True:
+            size_line = self.read_line()
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise HttpClientError(f"Invalid chunk size line {size_line[:32]!r}")
+            if size == 0:
+                # trailer diabaikan sampai baris kosong
+                while self.read_line():
+                    pass
+                return
+            self.read_exact(size, write)
+            if self.read_line():
+                raise HttpClientError("Missing CRLF after chunk data")
+
+    def read_to_close(self, write):
+        if self.buffer:
+            write(bytes(self.buffer))
+            self.buffer.clear()
+        while True:
+            data = self.sock.recv(RECV_SIZE)
+            if not data:
+                return
+            self.bytes_received += len(data)
+            write(data)
+
+
+class ConnectionPool:
+    """Idle keep-alive connections to one host:port, shared between threads"""
+
+    def __init__(self, host, port, timeout=DEFAULT_TIMEOUT, max_idle=MAX_IDLE_PER_HOST, idle_timeout=IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def get(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.idle:
+                connection = self.idle.pop()
+                if now - connection.released_at < self.idle_timeout:
+                    connection.reused = True
+                    return connection
+                connection.close()
+        return Connection(self.host, self.port, self.timeout)
+
+    def put(self, connection):
+        connection.released_at = time.monotonic()
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+
+class BulkResult:
+    """Ringkasan satu operasi bulk: file berhasil, gagal, total byte dan throughput"""
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.files = 0
+        self.bytes = 0
+        self.failed = []  # (nama file, pesan error)
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Aggregate bytes per second over the wall-clock time of the whole operation"""
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        summary = (f"{self.operation}: {self.files} files, {self.bytes / (1024 * 1024):.2f} MB in "
+                   f"{self.seconds:.2f} s ({self.throughput / (1024 * 1024):.2f} MB/s)")
+        if self.failed:
+            summary += f", {len(self.failed)} failed"
+        return summary
+
+
+def body_length(body):
+    """Remaining length of a bytes or file body, None if unknown (sent chunked)"""
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+    try:
+        return os.fstat(body.fileno()).st_size - body.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class HttpClient:
+    def __init__(self, host='localhost', port=8885, timeout=DEFAULT_TIMEOUT, max_idle_per_host=MAX_IDLE_PER_HOST):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.pools = {}
+        self.pools_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self.pools_lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def pool(self, host, port):
+        key = (host, port)
+        with self.pools_lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                pool = self.pools[key] = ConnectionPool(host, port, self.timeout, self.max_idle_per_host)
+            return pool
+
+    def request(self, method, path, headers=None, body=None, sink=None, host=None, port=None):
+        """Send one request and read the complete response.
+
+        body may be bytes or a binary file object (streamed). When sink is given and the
+        response is 200, the body is written to sink.write() instead of response.body.
+        """
+        pool = self.pool(host or self.host, port or self.port)
+        start_position = None
+        if body is not None and not isinstance(body, (bytes, bytearray, memoryview)):
+            try:
+                start_position = body.tell()
+            except (AttributeError, OSError):
+                pass
+
+        for attempt in range(2):
+            connection = pool.get()
+            connection.bytes_received = 0
+            sending = True
+            try:
+                self.send_request(connection, method, path, pool, headers or {}, body)
+                sending = False
+                response, keep_alive = self.read_response(connection, method, sink)
+            except socket.timeout:
+                connection.close()
+                raise
+            except (ConnectionError, OSError) as e:
+                connection.close()
+                # koneksi keep-alive lama yang ternyata sudah ditutup server: ulangi sekali di koneksi baru,
+                # hanya jika belum ada byte response (sink belum ditulis) dan request tidak mungkin
+                # sudah dijalankan server (gagal saat mengirim, atau method idempoten)
+                rewindable = body is None or isinstance(body, (bytes, bytearray, memoryview)) or start_position is not None
+                replayable = sending or method in IDEMPOTENT_METHODS
+                if attempt == 0 and connection.reused and connection.bytes_received == 0 and replayable and rewindable:
+                    if start_position is not None:
+                        body.seek(start_position)
+                    continue
+                raise HttpClientError(f"{method} {path} failed: {e}") from e
+            except HttpClientError:
+                connection.close()
+                raise
+            if keep_alive:
+                pool.put(connection)
+            else:
+                connection.close()
+            return response
+
+    def send_request(self, connection, method, path, pool, headers, body):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {pool.host}:{pool.port}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        length = None
+        if body is not None:
+            length = body_length(body)
+            if length is None:
+                lines.append("Transfer-Encoding: chunked")
+            else:
+                lines.append(f"Content-Length: {length}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8')
+
+        sock = connection.sock
+        if body is None:
+            sock.sendall(head)
+        elif isinstance(body, (bytes, bytearray, memoryview)):
+            if length <= SEND_CHUNK_SIZE:
+                sock.sendall(head + bytes(body))
+            else:
+                # body besar tidak disalin untuk digabung dengan header
+                sock.sendall(head)
+                sock.sendall(body)
+        elif length is not None:
+            sock.sendall(head)
+            if hasattr(body, 'fileno'):
+                # sendfile mulai dari posisi file saat ini, tanpa menyalin ke user space
+                sock.sendfile(body, count=length)
+            else:
+                self.send_stream(sock, body, chunked=False)
+        else:
+            sock.sendall(head)
+            self.send_stream(sock, body, chunked=True)
+
+    def send_stream(self, sock, stream, chunked):
+        chunk = memoryview(bytearray(SEND_CHUNK_SIZE))
+        while True:
+            n = stream.readinto(chunk)
+            if not n:
+                break
+            if chunked:
+                sock.sendall(b"%x\r\n" % n)
+                sock.sendall(chunk[:n])
+                sock.sendall(b"\r\n")
+            else:
+                sock.sendall(chunk[:n])
+        if chunked:
+            sock.sendall(b"0\r\n\r\n")
+
+    def read_response(self, connection, method, sink=None):
+        """Returns (ClientResponse, whether the connection can be reused)"""
+        while True:
+            head = connection.read_head()
+            lines = head.split(b"\r\n")
+            parts = lines[0].decode('latin-1').split(" ", 2)
+            if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+                raise HttpClientError(f"Invalid status line {lines[0][:64]!r}")
+            version, status, reason = parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ''
+            # response 1xx (mis. 100 Continue) diikuti response sebenarnya
+            if 100 <= status < 200:
+                continue
+            break
+
+        headers = {}
+        for line in lines[1:]:
+            name, colon, value = line.decode('latin-1').partition(":")
+            if not colon:
+                continue
+            name = name.strip().lower()
+            value = value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        tokens = {token.strip().lower() for token in headers.get('connection', '').split(',')}
+        keep_alive = 'close' not in tokens and (version == 'HTTP/1.1' or 'keep-alive' in tokens)
+
+        chunks = []
+        write = sink.write if sink is not None and status == 200 else chunks.append
+        if method == 'HEAD' or status in (204, 304):
+            pass
+        elif headers.get('transfer-encoding', '').split(',')[-1].strip().lower() == 'chunked':
+            connection.read_chunked(write)
+        elif 'content-length' in headers:
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                raise HttpClientError(f"Invalid Content-Length {headers['content-length']!r}")
+            connection.read_exact(length, write)
+        else:
+            # tanpa panjang body: body berakhir saat server menutup koneksi
+            connection.read_to_close(write)
+            keep_alive = False
+        return ClientResponse(status, reason, headers, b"".join(chunks)), keep_alive
+
+    # operasi untuk HttpServer tugas-4
+
+    def list_files(self, prefix=''):
+        """All files on the server as dicts (name, size, mtime, etag), following /list paging"""
+        files = []
+        cursor = None
+        while True:
+            query = {'format': 'json', 'limit': LIST_PAGE_SIZE}
+            if prefix:
+                query['prefix'] = prefix
+            if cursor:
+                query['cursor'] = cursor
+            response = self.request('GET', f"/list?{urlencode(query)}")
+            if not response.ok:
+                raise HttpClientError(f"List failed: {response.status} {response.text().strip()}")
+            page = response.json()
+            files += page['files']
+            cursor = page.get('next_cursor')
+            if not cursor:
+                return files
+
+    def upload_file(self, file_path, filename=None, if_match=None):
+        """Stream a local file to /upload; if_match (an ETag from /list or GET) makes the server
+        reject the upload with 412 when the file was changed by someone else in the meantime"""
+        filename = filename or os.path.basename(file_path)
+        headers = {'X-Filename': filename, 'Content-Type': 'application/octet-stream'}
+        if if_match:
+            headers['If-Match'] = if_match
+        with open(file_path, 'rb') as file:
+            return self.request('POST', '/upload', headers, file)
+
+    def download_file(self, filename, dest_path):
+        """Stream a file to dest_path (written to a temp name and renamed when complete)"""
+        temp_path = f"{dest_path}.part"
+        try:
+            with open(temp_path, 'wb') as file:
+                response = self.request('GET', f"/{filename}", sink=file)
+            if response.status == 200:
+                os.replace(temp_path, dest_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return response
+
+    def delete_file(self, filename):
+        return self.request('DELETE', f"/delete/{filename}")
+
+    def upload_directory(self, directory, workers=DEFAULT_WORKERS):
+        """Upload every regular file in directory with at most `workers` concurrent uploads"""
+        paths = sorted(entry.path for entry in os.scandir(directory) if entry.is_file())
+
+        def upload(path):
+            response = self.upload_file(path)
+            if not response.ok:
+                raise HttpClientError(f"{response.status} {response.text().strip()}")
+            return os.path.getsize(path)
+
+        return self.run_bulk('upload', [(os.path.basename(path), path) for path in paths], upload, workers)
+
+    def download_directory(self, dest_dir, names=None, workers=DEFAULT_WORKERS):
+        """Download the given files (default: everything /list returns) into dest_dir"""
+        os.makedirs(dest_dir, exist_ok=True)
+        if names is None:
+            names = [entry['name'] for entry in self.list_files()]
+
+        def download(name):
+            dest_path = os.path.join(dest_dir, os.path.basename(name))
+            response = self.download_file(name, dest_path)
+            if response.status != 200:
+                raise HttpClientError(f"{response.status} {response.text().strip()}")
+            return os.path.getsize(dest_path)
+
+        return self.run_bulk('download', [(name, name) for name in names], download, workers)
+
+    def run_bulk(self, operation, items, transfer, workers):
+        result = BulkResult(operation)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max(1, workers)) as executor:
+            futures = {executor.submit(transfer, argument): name for name, argument in items}
+            for future in as_completed(futures):
+                try:
+                    result.bytes += future.result()
+                    result.files += 1
+                except Exception as e:
+                    result.failed.append((futures[future], str(e)))
+        result.seconds = time.perf_counter() - started
+        return result
@@ -1,6 +1,346 @@
+import io
 import os
-import logging
-from datetime import datetime
+import sys
+import json
+import gzip
+import base64
+import bisect
+import stat
+import tempfile
+import time
+import fcntl
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs
+from email.utils import formatdate, parsedate_to_datetime
+from http_multipart import MultipartReader, multipart_boundary
+import http_metrics
+from access_log import access_logger
+
+MAX_RANGES = 16
+SENDFILE_THRESHOLD = 64 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_TEMP_PREFIX = '.upload-'
+LIST_BATCH_SIZE = 256
+LIST_DEFAULT_LIMIT = 1000
+LIST_MAX_LIMIT = 10000
+GZIP_MIN_SIZE = 1024
+GZIP_MAX_SIZE = 8 * 1024 * 1024
+GZIP_CACHE_BYTES = 64 * 1024 * 1024
+GZIP_LEVEL = 6
+MAX_REQUEST_LINE = 8 * 1024
+MAX_HEADER_SIZE = 64 * 1024
+MAX_HEADER_COUNT = 100
+WHITESPACE = b" \t"
+
+# bagian header yang sama untuk setiap response di-encode sekali saja
+CONNECTION_KEEP_ALIVE = b"Connection: keep-alive\r\n"
+CONNECTION_CLOSE = b"Connection: close\r\n"
+CONSTANT_HEADERS = b"Server: myserver/1.0\r\nX-Content-Type-Options: nosniff\r\nX-Frame-Options: DENY\r\n"
+CHUNKED_HEADER = b"Transfer-Encoding: chunked\r\n"
+
+status_lines = {}
+date_header = (0, b"")
+
+def status_line(status_code, message):
+    line = status_lines.get((status_code, message))
+    if line is None:
+        line = status_lines[(status_code, message)] = f"HTTP/1.1 {status_code} {message}\r\n".encode()
+    return line
+
+def http_date_header():
+    """Date header (RFC 7231 IMF-fixdate), diformat ulang paling banyak sekali per detik"""
+    global date_header
+    now = int(time.time())
+    cached = date_header
+    if cached[0] != now:
+        cached = date_header = (now, f"Date: {formatdate(now, usegmt=True)}\r\n".encode())
+    return cached[1]
+
+def encode_headers(headers):
+    return ''.join(f"{key}:{value}\r\n" for key, value in headers.items()).encode()
+
+def file_etag(size, mtime_ns):
+    return f'"{size:x}-{mtime_ns:x}"'
+
+def has_control_chars(name):
+    """NUL and other control characters, never valid in a stored filename"""
+    return any(ord(char) < 32 or char == '\x7f' for char in name)
+
+def prefix_upper_bound(prefix):
+    """Smallest string above every string starting with prefix, None if there is none"""
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def etag_list(value):
+    return [tag.strip() for tag in value.split(",")]
+
+class RequestParseError(Exception):
+    """Request head yang tidak valid, status_code adalah response error yang harus dikirim"""
+
+    def __init__(self, status_code, message, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.message = message
+        self.detail = detail
+
+class PreconditionFailed(Exception):
+    """If-Match / If-None-Match of an upload does not hold for the current version of the file"""
+
+class HttpHeaders(dict):
+    """Header request dengan nama lowercase, lookup tidak peka huruf besar/kecil"""
+
+    def __getitem__(self, name):
+        return super().__getitem__(name.lower())
+
+    def __contains__(self, name):
+        return super().__contains__(name.lower())
+
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+class HttpRequest:
+    """Request yang di-parse sekali dari bytes header, diteruskan ke semua handler"""
+
+    def __init__(self, method, target, version, headers, content_length=0, body=None):
+        self.method = method
+        self.target = target
+        self.path, _, self.query = target.partition('?')
+        self.version = version
+        self.headers = headers
+        self.content_length = content_length
+        # body berupa stream (readinto/read), lihat http_connection.BodyReader
+        self.body = body if body is not None else io.BytesIO(b'')
+        # pola route yang cocok (mis. /delete/<name>), diisi saat dispatch, dipakai sebagai label metrik
+        self.route = '-'
+
+    @property
+    def head_only(self):
+        return self.method == 'HEAD'
+
+    @property
+    def chunked(self):
+        transfer_encoding = self.headers.get('transfer-encoding')
+        return bool(transfer_encoding) and transfer_encoding.split(',')[-1].strip().lower() == 'chunked'
+
+    @property
+    def keep_alive(self):
+        """HTTP/1.1 defaults to keep-alive, HTTP/1.0 only when asked for"""
+        tokens = {token.strip().lower() for token in self.headers.get('connection', '').split(',')}
+        if 'close' in tokens:
+            return False
+        return self.version == 'HTTP/1.1' or 'keep-alive' in tokens
+
+def parse_request(head, body=None):
+    """Parse request line dan header dari bytes (tanpa CRLF kosong penutup) dalam satu pass"""
+    if len(head) > MAX_HEADER_SIZE:
+        raise RequestParseError(431, 'Request Header Fields Too Large', 'Request header too large')
+
+    lines = head.split(b"\r\n")
+    request_line = lines[0]
+    if len(request_line) > MAX_REQUEST_LINE:
+        raise RequestParseError(414, 'URI Too Long', 'Request line too long')
+    if len(lines) - 1 > MAX_HEADER_COUNT:
+        raise RequestParseError(431, 'Request Header Fields Too Large', 'Too many header fields')
+
+    parts = request_line.split(b" ")
+    if len(parts) != 3 or not parts[0] or not parts[1] or not parts[2].startswith(b"HTTP/"):
+        raise RequestParseError(400, 'Bad Request', 'Malformed request line')
+    try:
+        method = parts[0].decode('ascii').upper()
+        target = parts[1].decode('utf-8')
+        version = parts[2].decode('ascii').upper()
+    except UnicodeDecodeError:
+        raise RequestParseError(400, 'Bad Request', 'Invalid characters in request line')
+
+    fields = {}
+    for line in lines[1:]:
+        name, colon, value = line.partition(b":")
+        # obsolete line folding dan spasi sebelum ':' ditolak (RFC 7230 3.2.4)
+        if not colon or not name or name[0] in WHITESPACE or name[-1] in WHITESPACE:
+            raise RequestParseError(400, 'Bad Request', 'Malformed header line')
+        try:
+            key = name.decode('ascii').lower()
+            value = value.strip(b" \t").decode('utf-8')
+        except UnicodeDecodeError:
+            raise RequestParseError(400, 'Bad Request', 'Invalid characters in header')
+        previous = fields.get(key)
+        fields[key] = value if previous is None else f"{previous}, {value}"
+
+    content_length = 0
+    length_field = fields.get('content-length')
+    if length_field is not None:
+        lengths = {length.strip() for length in length_field.split(',')}
+        if len(lengths) != 1 or not next(iter(lengths)).isdigit():
+            raise RequestParseError(400, 'Bad Request', 'Invalid Content-Length')
+        content_length = int(lengths.pop())
+
+    headers = HttpHeaders(fields)
+    request = HttpRequest(method, target, version, headers, content_length, body)
+    if 'transfer-encoding' in fields and not request.chunked:
+        raise RequestParseError(400, 'Bad Request', 'Unsupported Transfer-Encoding')
+    return request
+
+class HttpResponse:
+    def __init__(self, status_code=404, message='Not Found', body=bytes(), headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode()
+        self.status_code = status_code
+        self.message = message
+        self.body = body
+        self.headers = dict(headers) if headers else {}
+        self.keep_alive = False
+        self.head_only = False
+        self.content_length = len(body)
+        self.file = None
+        self.file_segments = None
+        # body yang sudah di memori tetapi terdiri dari beberapa bagian (range multipart), tidak digabung
+        self.body_parts = None
+        # body generator yang panjangnya belum diketahui, dikirim dengan chunked encoding
+        self.body_iter = None
+        self.chunked = False
+        # header tambahan yang sudah di-encode (route statis), dikirim sebelum self.headers
+        self.header_block = b""
+
+    def head_bytes(self):
+        parts = [
+            status_line(self.status_code, self.message),
+            http_date_header(),
+            CONNECTION_KEEP_ALIVE if self.keep_alive else CONNECTION_CLOSE,
+            CONSTANT_HEADERS,
+        ]
+        # 304 tidak membawa body, Content-Length 0 di sini akan salah mendeskripsikan representasinya
+        # content_length None: panjang tidak diketahui (HEAD gzip yang belum dikompresi), header dihilangkan
+        if self.body_iter is not None:
+            if self.chunked:
+                parts.append(CHUNKED_HEADER)
+        elif self.status_code != 304 and self.content_length is not None:
+            parts.append(b"Content-Length: %d\r\n" % self.content_length)
+        parts.append(self.header_block)
+        if self.headers:
+            parts.append(encode_headers(self.headers))
+        parts.append(b"\r\n")
+        return b"".join(parts)
+
+    def attach_file(self, file, segments):
+        """Body dikirim langsung dari file (sendfile), segments berisi bytes atau (offset, length)"""
+        self.file = file
+        self.file_segments = segments
+        self.content_length = sum(len(segment) if isinstance(segment, bytes) else segment[1] for segment in segments)
+
+    def attach_iter(self, body_iter):
+        """Body dihasilkan bertahap oleh generator (bytes per chunk)"""
+        self.body_iter = body_iter
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        if self.body_iter is not None and hasattr(self.body_iter, 'close'):
+            self.body_iter.close()
+
+    def read_file_segments(self):
+        body_parts = []
+        for segment in self.file_segments:
+            if isinstance(segment, bytes):
+                body_parts.append(segment)
+            else:
+                self.file.seek(segment[0])
+                body_parts.append(self.file.read(segment[1]))
+        return body_parts
+
+    def load_file_body(self):
+        """Read the file segments into memory and release the file"""
+        self.body_parts = self.read_file_segments()
+        self.close()
+
+    def buffers(self, head=None):
+        """Head and body as separate buffers for a scatter/gather write (sendmsg/writelines)
+
+        The body is never concatenated with the head, so it is not copied. head may be
+        passed when the caller already built it with head_bytes()."""
+        if self.head_only or self.status_code == 304:
+            return [head or self.head_bytes()]
+        if self.body_iter is not None:
+            # tanpa koneksi untuk streaming, body generator dikumpulkan dulu
+            body_iter = self.body_iter
+            self.body_parts = list(body_iter)
+            self.content_length = sum(len(part) for part in self.body_parts)
+            self.body_iter = None
+            if hasattr(body_iter, 'close'):
+                body_iter.close()
+            head = None
+        head = head or self.head_bytes()
+        if self.file is not None:
+            body_parts = self.read_file_segments()
+        elif self.body_parts is not None:
+            body_parts = self.body_parts
+        else:
+            body_parts = [self.body]
+        return [head] + [memoryview(part) for part in body_parts if part]
+
+    def to_bytes(self):
+        return b"".join(self.buffers())
+
+class Router:
+    """Routing tabel: path exact diselesaikan dengan satu lookup dict,
+    pola prefix dengan satu parameter di akhir (mis. /delete/<name>) dicek sesudahnya,
+    route fallback (file statis) hanya dipakai jika keduanya tidak cocok dan method-nya didukung"""
+
+    def __init__(self):
+        self.exact_routes = {}   # path -> {method: handler}
+        self.prefix_routes = []  # (prefix, param, {method: handler}, pattern), prefix terpanjang dicek lebih dulu
+        self.fallback = None     # (prefix, param, {method: handler}, pattern)
+
+    def add(self, method, pattern, handler):
+        method = method.upper()
+        if '<' not in pattern:
+            self.exact_routes.setdefault(pattern, {})[method] = handler
+            return
+
+        prefix, _, param = pattern.partition('<')
+        if not param.endswith('>') or '<' in param[:-1] or '>' in param[:-1]:
+            raise ValueError(f"Unsupported route pattern {pattern}")
+        param = param[:-1]
+        for route_prefix, route_param, handlers, _ in self.prefix_routes:
+            if route_prefix == prefix and route_param == param:
+                handlers[method] = handler
+                return
+        self.prefix_routes.append((prefix, param, {method: handler}, pattern))
+        self.prefix_routes.sort(key=lambda route: len(route[0]), reverse=True)
+
+    def add_fallback(self, method, pattern, handler):
+        """Catch-all prefix route (e.g. /<path>) tried after every other route"""
+        prefix, _, param = pattern.partition('<')
+        if self.fallback is None:
+            self.fallback = (prefix, param.rstrip('>'), {}, pattern)
+        self.fallback[2][method.upper()] = handler
+
+    def resolve(self, path, method=None):
+        """Handlers per method, path parameters and the matched pattern, (None, None, None) if no route matches"""
+        handlers = self.exact_routes.get(path)
+        if handlers is not None:
+            return handlers, {}, path
+        for prefix, param, handlers, pattern in self.prefix_routes:
+            if path.startswith(prefix):
+                return handlers, {param: path[len(prefix):]}, pattern
+        if self.fallback is not None:
+            prefix, param, handlers, pattern = self.fallback
+            # method yang tidak didukung fallback berarti path-nya memang tidak ada (404, bukan 405)
+            supported = method is None or method in handlers or (method == 'HEAD' and 'GET' in handlers)
+            if path.startswith(prefix) and supported:
+                return handlers, {param: path[len(prefix):]}, pattern
+        return None, None, None
+
+    @staticmethod
+    def allowed_methods(handlers):
+        methods = set(handlers)
+        if 'GET' in methods:
+            methods.add('HEAD')
+        return ', '.join(sorted(methods))
 
 class HttpServer:
     def __init__(self):
@@ -19,72 +359,298 @@ class HttpServer:
             '.json': 'application/json'
         }
 
-        logging.basicConfig(level=logging.INFO, format='%(message)s')
-        self.logger = logging.getLogger(__name__)
-        
-    def create_response(self, status_code=404, message='Not Found', body=bytes(), headers={}):
-        timestamp = datetime.now().strftime('%c')
-        response_lines = []
-        response_lines.append(f"HTTP/1.0 {status_code} {message}\r\n")
-        response_lines.append(f"Date: {timestamp}\r\n")
-        response_lines.append("Connection: close\r\n")
-        response_lines.append("Server: myserver/1.0\r\n")
-        response_lines.append(f"Content-Length: {len(body)}\r\n")
-        response_lines.append("X-Content-Type-Options: nosniff\r\n")
-        response_lines.append("X-Frame-Options: DENY\r\n")
-        
-        for key, value in headers.items():
-            response_lines.append(f"{key}:{value}\r\n")
-        response_lines.append("\r\n")
+        # path -> (stat key, metadata), validator hanya dihitung ulang jika file berubah
+        self.file_metadata = {}
 
-        response_headers = ''.join(response_lines)
-            
+        # mime type teks yang layak dikompres dengan gzip
+        self.compressible_types = {mime_type for mime_type in self.mime_types.values()
+                                   if mime_type.startswith('text/') or mime_type in ('application/javascript',
+                                                                                   'application/json')}
+        # path -> (stat key, gzip bytes), LRU dibatasi GZIP_CACHE_BYTES sehingga tiap file dikompres sekali
+        self.gzip_cache = OrderedDict()
+        self.gzip_cache_size = 0
+        self.gzip_lock = threading.Lock()
+
+        # snapshot isi direktori untuk /list, dibangun ulang jika direktori berubah
+        self.directory_snapshot = None
+        self.directory_lock = threading.Lock()
+
+        # buffer copy upload per thread (lihat upload_buffer)
+        self.upload_buffers = threading.local()
+
+        self.router = Router()
+        self.register_routes()
+
+    def register_routes(self):
+        # handler dipanggil sebagai handler(request, params)
+        self.add_static_route('GET', '/', 200, 'OK', 'Ini Adalah web Server percobaan', {'Content-type': 'text/plain'})
+        self.add_static_route('GET', '/video', 302, 'Found', '', {'Location': 'https://youtu.be/katoxpnTf04'})
+        self.add_static_route('GET', '/santai', 200, 'OK', 'santai saja', {'Content-type': 'text/plain'})
+        self.router.add('GET', '/list', self.handle_list)
+        self.router.add('GET', '/metrics', self.handle_metrics)
+        self.router.add('POST', '/upload', self.handle_upload)
+        self.router.add('DELETE', '/delete/<name>', self.handle_delete)
+        self.router.add_fallback('GET', '/<path>', self.handle_file)
+
+    def add_static_route(self, method, path, status_code, message, body, headers):
+        """Route dengan response tetap, body dan header di-encode sekali saat registrasi"""
         if not isinstance(body, bytes):
             body = body.encode()
+        header_block = encode_headers(headers)
+        status_line(status_code, message)
 
-        return response_headers.encode() + body
+        def handler(request, params):
+            response = HttpResponse(status_code, message, body)
+            response.header_block = header_block
+            return response
 
-    def process_request(self, data, body=b''):
-        request_lines = data.split("\r\n")
-        
-        if not request_lines:
-            return self.create_response(400, 'Bad Request', 'Empty request', {})
-            
-        request_line = request_lines[0]
-        headers = [line for line in request_lines[1:] if line != '']
+        self.router.add(method, path, handler)
 
-        print(f"Request: {request_line}")
-    
-        parts = request_line.split(" ")
-        try:
-            method = parts[0].upper().strip()
-            path = parts[1].strip()
-            
-            if method == 'GET':
-                return self.handle_get(path, headers)
-            elif method == 'POST':
-                return self.handle_post(path, headers, body)
-            elif method == 'DELETE':
-                return self.handle_delete(path, headers)
-            else:
-                return self.create_response(405, 'Method Not Allowed', f'Method {method} not supported', 
-                                           {'Content-type': 'text/plain'})
-        except IndexError:
-            return self.create_response(400, 'Bad Request', 'Malformed request line', 
+    def create_response(self, status_code=404, message='Not Found', body=bytes(), headers={}):
+        return HttpResponse(status_code, message, body, headers)
+
+    def process_request(self, request, body=b''):
+        """Handle an HttpRequest, a raw request head (str/bytes) is parsed first"""
+        if not isinstance(request, HttpRequest):
+            # body berupa stream (readinto/read), bytes dibungkus supaya handler cukup mengenal satu interface
+            if isinstance(body, (bytes, bytearray)):
+                body = io.BytesIO(body)
+            if isinstance(request, str):
+                request = request.encode()
+            try:
+                request = parse_request(request.split(b"\r\n\r\n", 1)[0], body)
+            except RequestParseError as e:
+                return self.create_response(e.status_code, e.message, e.detail, {'Content-type': 'text/plain'})
+
+        return self.dispatch(request)
+
+    def dispatch(self, request):
+        handlers, params, route = self.router.resolve(request.path, request.method)
+        if handlers is None:
+            return self.create_response(404, 'Not Found', f'{request.method} endpoint {request.path} not found', 
                                        {'Content-type': 'text/plain'})
 
-    def handle_get(self, path, headers):
+        request.route = route
+        handler = handlers.get(request.method) or (handlers.get('GET') if request.head_only else None)
+        if handler is None:
+            return self.create_response(405, 'Method Not Allowed', f'Method {request.method} not supported', 
+                                       {'Content-type': 'text/plain', 'Allow': Router.allowed_methods(handlers)})
+
+        response = handler(request, params)
+        if request.head_only:
+            response.head_only = True
+        return response
+
+    def get_file_metadata(self, file_path, file_stat):
+        stat_key = (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        cached = self.file_metadata.get(file_path)
+        if cached and cached[0] == stat_key:
+            return cached[1]
+
+        file_extension = os.path.splitext(file_path)[1].lower()
+        content_type = self.mime_types.get(file_extension, 'application/octet-stream')
+        metadata = {
+            'etag': file_etag(file_stat.st_size, file_stat.st_mtime_ns),
+            'gzip_etag': f'"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}-gz"',
+            'last_modified': formatdate(file_stat.st_mtime, usegmt=True),
+            'mtime': int(file_stat.st_mtime),
+            'content_type': content_type,
+            # file terlalu kecil tidak sebanding dengan overhead gzip, file besar tetap dikirim dengan sendfile
+            'compressible': (content_type in self.compressible_types
+                             and GZIP_MIN_SIZE <= file_stat.st_size <= GZIP_MAX_SIZE),
+        }
+        self.file_metadata[file_path] = (stat_key, metadata)
+        return metadata
+
+    def accepts_gzip(self, request_headers):
+        accept_encoding = request_headers.get('accept-encoding')
+        if not accept_encoding:
+            return False
+        qualities = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            quality = 1.0
+            for param in params.split(";"):
+                name, _, value = param.strip().partition("=")
+                if name.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[coding.strip().lower()] = quality
+        if 'gzip' in qualities:
+            return qualities['gzip'] > 0
+        return qualities.get('*', 0) > 0
+
+    def cached_gzip_size(self, file_path, file_stat):
+        """Length of the cached compressed content, None if it is not cached"""
+        stat_key = (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        with self.gzip_lock:
+            cached = self.gzip_cache.get(file_path)
+            if cached and cached[0] == stat_key:
+                return len(cached[1])
+        return None
+
+    def get_gzip_body(self, file_path, file_stat):
+        """Compressed file content from the cache, None if the file changed while reading"""
+        stat_key = (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        with self.gzip_lock:
+            cached = self.gzip_cache.get(file_path)
+            if cached and cached[0] == stat_key:
+                self.gzip_cache.move_to_end(file_path)
+                return cached[1]
+
+        with open(file_path, 'rb') as file:
+            opened_stat = os.fstat(file.fileno())
+            if (opened_stat.st_ino, opened_stat.st_size, opened_stat.st_mtime_ns) != stat_key:
+                return None
+            # mtime=0 supaya hasil kompresi (dan ETag-nya) sama di setiap worker
+            compressed = gzip.compress(file.read(), compresslevel=GZIP_LEVEL, mtime=0)
+
+        with self.gzip_lock:
+            previous = self.gzip_cache.pop(file_path, None)
+            if previous:
+                self.gzip_cache_size -= len(previous[1])
+            self.gzip_cache[file_path] = (stat_key, compressed)
+            self.gzip_cache_size += len(compressed)
+            while self.gzip_cache_size > GZIP_CACHE_BYTES and len(self.gzip_cache) > 1:
+                _, (_, evicted) = self.gzip_cache.popitem(last=False)
+                self.gzip_cache_size -= len(evicted)
+        return compressed
+
+    def forget_file(self, file_path):
+        self.file_metadata.pop(file_path, None)
+        self.directory_snapshot = None
+        with self.gzip_lock:
+            cached = self.gzip_cache.pop(file_path, None)
+            if cached:
+                self.gzip_cache_size -= len(cached[1])
+
+    def is_not_modified(self, request_headers, metadata, etag=None):
+        etag = etag or metadata['etag']
+        if_none_match = request_headers.get('if-none-match')
+        if if_none_match is not None:
+            # If-None-Match lebih diutamakan daripada If-Modified-Since (weak comparison)
+            if if_none_match.strip() == '*':
+                return True
+            for tag in if_none_match.split(","):
+                tag = tag.strip()
+                if tag.startswith('W/'):
+                    tag = tag[2:]
+                if tag == etag:
+                    return True
+            return False
+
+        if_modified_since = request_headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                return metadata['mtime'] <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def parse_range(self, request_headers, metadata, file_size):
+        """None = serve the whole file, [] = unsatisfiable, otherwise list of inclusive (start, end)"""
+        range_header = request_headers.get('range')
+        if not range_header:
+            return None
+
+        # If-Range yang tidak cocok berarti client punya versi lama, kirim file utuh
+        if_range = request_headers.get('if-range')
+        if if_range is not None and if_range.strip() not in (metadata['etag'], metadata['last_modified']):
+            return None
+
+        unit, _, range_set = range_header.partition('=')
+        if unit.strip().lower() != 'bytes':
+            return None
+
+        specs = range_set.split(',')
+        if len(specs) > MAX_RANGES:
+            return None
+
+        ranges = []
+        for spec in specs:
+            first, dash, last = spec.strip().partition('-')
+            if not dash:
+                return None
+            try:
+                if first == '':
+                    suffix_length = int(last)
+                    if suffix_length < 0:
+                        return None
+                    start, end = max(0, file_size - suffix_length), file_size - 1
+                    if suffix_length == 0:
+                        continue
+                else:
+                    start = int(first)
+                    end = int(last) if last else file_size - 1
+                    if start < 0 or (last and end < start):
+                        return None
+                    end = min(end, file_size - 1)
+            except ValueError:
+                return None
+            if start < file_size:
+                ranges.append((start, end))
+        return ranges
+
+    def create_range_response(self, file_path, file_stat, ranges, response_headers, head_only=False):
+        file_size = file_stat.st_size
+        # segmen body: bytes apa adanya, atau (offset, length) yang dibaca dari file
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            response_headers['Content-Range'] = f"bytes {start}-{end}/{file_size}"
+            segments = [(start, end - start + 1)]
+        else:
+            boundary = os.urandom(12).hex()
+            content_type = response_headers['Content-type']
+            response_headers['Content-type'] = f"multipart/byteranges; boundary={boundary}"
+            segments = []
+            for start, end in ranges:
+                segments.append(f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+                                f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n".encode())
+                segments.append((start, end - start + 1))
+                segments.append(b"\r\n")
+            segments.append(f"--{boundary}--\r\n".encode())
+
+        return self.create_file_response(206, 'Partial Content', file_path, file_stat, segments,
+                                         response_headers, head_only)
+
+    def create_file_response(self, status_code, message, file_path, file_stat, segments, response_headers,
+                             head_only=False):
+        content_length = sum(len(segment) if isinstance(segment, bytes) else segment[1] for segment in segments)
+        response = self.create_response(status_code, message, b'', response_headers)
+        response.content_length = content_length
+        if head_only:
+            return response
+
+        file = open(file_path, 'rb')
+        opened_stat = os.fstat(file.fileno())
+        if (opened_stat.st_ino, opened_stat.st_size, opened_stat.st_mtime_ns) != \
+                (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns):
+            # file diganti di antara stat dan open, header yang sudah dihitung tidak berlaku lagi
+            file.close()
+            return None
+
+        response.attach_file(file, segments)
+        if content_length < SENDFILE_THRESHOLD:
+            # body kecil cukup dibaca ke memori dan dikirim bersama header dalam satu send
+            response.load_file_body()
+        return response
+
+    def handle_list(self, request, params):
+        return self.list_directory('./', parse_qs(request.query))
+
+    def handle_metrics(self, request, params):
+        response = self.create_response(200, 'OK', http_metrics.registry.render().encode(),
+                                        {'Content-type': http_metrics.CONTENT_TYPE})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    def handle_file(self, request, params):
+        return self.handle_get(request.path, request.headers, request.head_only)
+
+    def handle_get(self, path, request_headers, head_only=False, retry=True):
         base_dir = './'
-        
-        if path == '/':
-            return self.create_response(200, 'OK', 'Ini Adalah web Server percobaan', 
-                                       {'Content-type': 'text/plain'})
-        if path == '/video':
-            return self.create_response(302, 'Found', '', {'Location': 'https://youtu.be/katoxpnTf04'})
-        if path == '/santai':
-            return self.create_response(200, 'OK', 'santai saja', {'Content-type': 'text/plain'})
-        if path == '/list':
-            return self.list_directory(base_dir)
 
         if path.startswith('/'):
             path = path[1:]
@@ -95,52 +661,91 @@ class HttpServer:
         
         file_path = os.path.join(base_dir, path)
         
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            file_stat = None
+        if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
             return self.create_response(404, 'Not Found', f'File {path} not found', 
                                        {'Content-type': 'text/plain'})
             
         try:
-            with open(file_path, 'rb') as file:
-                content = file.read()
-            
-            file_extension = os.path.splitext(file_path)[1].lower()
-            content_type = self.mime_types.get(file_extension, 'application/octet-stream')
-            
-            headers = {'Content-type': content_type}
-            return self.create_response(200, 'OK', content, headers)
+            metadata = self.get_file_metadata(file_path, file_stat)
+            response_headers = {
+                'Content-type': metadata['content_type'],
+                'ETag': metadata['etag'],
+                'Last-Modified': metadata['last_modified'],
+            }
+
+            # range request tetap dilayani dari representasi asli (identity)
+            use_gzip = (metadata['compressible'] and 'range' not in request_headers
+                        and self.accepts_gzip(request_headers))
+            if metadata['compressible']:
+                response_headers['Vary'] = 'Accept-Encoding'
+            if use_gzip:
+                response_headers['ETag'] = metadata['gzip_etag']
+
+            if self.is_not_modified(request_headers, metadata, response_headers['ETag']):
+                return self.create_response(304, 'Not Modified', b'', response_headers)
+
+            if use_gzip and head_only:
+                # HEAD tidak mengompresi file hanya demi Content-Length, panjang dipakai bila sudah di cache
+                response_headers['Content-Encoding'] = 'gzip'
+                response = self.create_response(200, 'OK', b'', response_headers)
+                response.content_length = self.cached_gzip_size(file_path, file_stat)
+                return response
+
+            if use_gzip:
+                compressed = self.get_gzip_body(file_path, file_stat)
+                if compressed is not None:
+                    response_headers['Content-Encoding'] = 'gzip'
+                    return self.create_response(200, 'OK', compressed, response_headers)
+                if retry:
+                    return self.handle_get(path, request_headers, head_only, retry=False)
+                return self.create_response(503, 'Service Unavailable', f'File {path} is being replaced', 
+                                           {'Content-type': 'text/plain', 'Retry-After': '1'})
+
+            response_headers['Accept-Ranges'] = 'bytes'
+            ranges = self.parse_range(request_headers, metadata, file_stat.st_size)
+            if ranges == []:
+                response_headers['Content-Range'] = f"bytes */{file_stat.st_size}"
+                response_headers['Content-type'] = 'text/plain'
+                return self.create_response(416, 'Range Not Satisfiable', 'Requested range not satisfiable', 
+                                           response_headers)
+            if ranges:
+                response = self.create_range_response(file_path, file_stat, ranges, response_headers, head_only)
+            else:
+                response = self.create_file_response(200, 'OK', file_path, file_stat, [(0, file_stat.st_size)],
+                                                     response_headers, head_only)
+
+            if response is None:
+                if retry:
+                    return self.handle_get(path, request_headers, head_only, retry=False)
+                return self.create_response(503, 'Service Unavailable', f'File {path} is being replaced', 
+                                           {'Content-type': 'text/plain', 'Retry-After': '1'})
+            return response
             
         except Exception as e:
-            self.logger.error(f"Error reading file {file_path}: {str(e)}")
+            access_logger.error('read failed', file=file_path, error=str(e))
             return self.create_response(500, 'Internal Server Error', f'Error reading file: {str(e)}', 
                                        {'Content-type': 'text/plain'})
     
-    def handle_post(self, path, headers, body):
-        headers_dict = {}
-        for header in headers:
-            if ":" in header:
-                key, value = header.split(":", 1)
-                headers_dict[key.strip().lower()] = value.strip()
-
-        if path == '/upload':
-            return self.upload_file(headers_dict, body)
-        
-        return self.create_response(404, 'Not Found', f'POST endpoint {path} not found', 
-                                   {'Content-type': 'text/plain'})
+    def handle_upload(self, request, params):
+        content_type = request.headers.get('content-type', '')
+        if content_type.lower().startswith('multipart/form-data'):
+            return self.upload_multipart(content_type, request.body)
+        return self.upload_file(request.headers, request.body)
 
-    def handle_delete(self, path, headers):
-        if path.startswith('/delete/'):
-            filename = path[len('/delete/'):]
-            return self.delete_file(filename)
-        
-        return self.create_response(404, 'Not Found', f'DELETE endpoint {path} not found', 
-                                   {'Content-type': 'text/plain'})
+    def handle_delete(self, request, params):
+        return self.delete_file(params['name'])
 
     def upload_file(self, headers, body):
         filename = headers.get('x-filename', None)
         content_length = headers.get('content-length', '0')
+        chunked = headers.get('transfer-encoding', '').split(',')[-1].strip().lower() == 'chunked'
         
         try:
-            length = int(content_length)
+            length = None if chunked else int(content_length)
         except ValueError:
             return self.create_response(400, 'Bad Request', 'Invalid Content-Length', 
                                        {'Content-type': 'text/plain'})
@@ -149,24 +754,180 @@ class HttpServer:
             return self.create_response(400, 'Bad Request', 'Missing X-Filename header', 
                                        {'Content-type': 'text/plain'})
         
-        if '..' in filename or '/' in filename or '\\' in filename:
+        if ('..' in filename or '/' in filename or '\\' in filename or filename.startswith(UPLOAD_TEMP_PREFIX)
+                or has_control_chars(filename)):
             return self.create_response(403, 'Forbidden', 'Invalid filename', 
                                        {'Content-type': 'text/plain'})
 
-        if length == 0 or len(body) != length:
+        # '.' atau nama direktori yang sudah ada tidak bisa ditimpa dengan os.replace
+        if filename == '.' or os.path.isdir(filename):
+            return self.create_response(400, 'Bad Request', 'Filename refers to a directory', 
+                                       {'Content-type': 'text/plain'})
+
+        if length == 0:
             return self.create_response(400, 'Bad Request', 'Content-Length mismatch', 
                                        {'Content-type': 'text/plain'})
 
         try:
-            with open(filename, 'wb') as file:
-                file.write(body)
-            print(f"File uploaded: {filename}")
+            temp_path, received = self.write_temp_file(body, length)
+        except ValueError as e:
+            # chunked body rusak atau koneksi putus di tengah body
+            return self.create_response(400, 'Bad Request', f'Invalid request body: {str(e)}', 
+                                       {'Content-type': 'text/plain'})
+        except Exception as e:
+            access_logger.error('upload failed', file=filename, error=str(e))
+            return self.create_response(500, 'Internal Server Error', f'Upload failed: {str(e)}', 
+                                       {'Content-type': 'text/plain'})
+
+        try:
+            if chunked and not getattr(body, 'complete', True):
+                os.remove(temp_path)
+                return self.create_response(400, 'Bad Request', 'Incomplete chunked body', 
+                                           {'Content-type': 'text/plain'})
+            if not chunked and received != length:
+                os.remove(temp_path)
+                return self.create_response(400, 'Bad Request', 'Content-Length mismatch', 
+                                           {'Content-type': 'text/plain'})
+
+            etag = self.commit_upload(temp_path, filename, headers)
             return self.create_response(200, 'OK', f'File {filename} uploaded successfully.\n', 
+                                       {'Content-type': 'text/plain', 'ETag': etag})
+        except PreconditionFailed as e:
+            os.remove(temp_path)
+            return self.create_response(412, 'Precondition Failed', f'{str(e)}\n',
                                        {'Content-type': 'text/plain'})
         except Exception as e:
-            self.logger.error(f"Error uploading file {filename}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            access_logger.error('upload failed', file=filename, error=str(e))
             return self.create_response(500, 'Internal Server Error', f'Upload failed: {str(e)}', 
                                        {'Content-type': 'text/plain'})
+
+    def upload_buffer(self, length=None):
+        """Copy buffer for write_temp_file: exactly length bytes for small bodies of known size,
+        otherwise one UPLOAD_CHUNK_SIZE buffer per thread, reused across uploads"""
+        if length is not None and length < UPLOAD_CHUNK_SIZE:
+            return memoryview(bytearray(max(length, 1)))
+        buffer = getattr(self.upload_buffers, 'buffer', None)
+        if buffer is None:
+            buffer = self.upload_buffers.buffer = memoryview(bytearray(UPLOAD_CHUNK_SIZE))
+        return buffer
+
+    def write_temp_file(self, stream, length=None):
+        """Copy a readinto() stream to a new temp file, returns (temp path, bytes written)"""
+        # body ditulis ke file sementara sambil diterima, lalu di-rename sehingga
+        # upload yang belum selesai tidak pernah terlihat dengan nama aslinya
+        temp_fd, temp_path = tempfile.mkstemp(prefix=UPLOAD_TEMP_PREFIX, dir='.')
+        try:
+            os.fchmod(temp_fd, 0o644)
+            received = 0
+            chunk = self.upload_buffer(length)
+            with os.fdopen(temp_fd, 'wb') as file:
+                while True:
+                    n = stream.readinto(chunk)
+                    if not n:
+                        break
+                    file.write(chunk[:n])
+                    received += n
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path, received
+
+    def commit_upload(self, temp_path, filename, headers=None):
+        """Publish a complete temp file under filename, returns the ETag of the new version"""
+        temp_stat = os.stat(temp_path)
+        # os.replace atomik: request berikutnya langsung melihat versi baru yang lengkap,
+        # reader yang sudah membuka versi lama tetap membacanya lewat fd miliknya
+        with self.publish_lock():
+            if headers is not None:
+                self.check_upload_preconditions(filename, headers)
+            os.replace(temp_path, filename)
+        self.forget_file(os.path.join('./', filename))
+        access_logger.info('file uploaded', file=filename)
+        return file_etag(temp_stat.st_size, temp_stat.st_mtime_ns)
+
+    @contextmanager
+    def publish_lock(self):
+        """Serialize precondition check + rename across threads and worker processes"""
+        # flock pada direktori itu sendiri, tidak perlu file lock tambahan; setiap os.open
+        # punya open file description sendiri sehingga thread dalam satu proses juga saling tunggu
+        dir_fd = os.open('.', os.O_RDONLY)
+        try:
+            fcntl.flock(dir_fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(dir_fd)
+
+    def check_upload_preconditions(self, filename, headers):
+        """RFC 7232 If-Match / If-None-Match against the file as it is now (strong comparison)"""
+        if_match = headers.get('if-match')
+        if_none_match = headers.get('if-none-match')
+        if if_match is None and if_none_match is None:
+            return
+        try:
+            current_stat = os.stat(filename)
+            current = file_etag(current_stat.st_size, current_stat.st_mtime_ns)
+        except FileNotFoundError:
+            current = None
+
+        if if_match is not None:
+            tags = etag_list(if_match)
+            if current is None or ('*' not in tags and current not in tags):
+                raise PreconditionFailed(f'File {filename} has changed (current ETag {current or "none"})')
+        if if_none_match is not None:
+            tags = etag_list(if_none_match)
+            if current is not None and ('*' in tags or current in tags):
+                raise PreconditionFailed(f'File {filename} already exists (current ETag {current})')
+
+    def upload_multipart(self, content_type, body):
+        boundary = multipart_boundary(content_type)
+        if boundary is None:
+            return self.create_response(400, 'Bad Request', 'Missing or invalid multipart boundary', 
+                                       {'Content-type': 'text/plain'})
+
+        results = []
+        try:
+            for part in MultipartReader(body, boundary):
+                if part.filename is None:
+                    # field form biasa (bukan file) tidak disimpan
+                    part.drain()
+                    continue
+                # RFC 7578 4.2: path dari client dibuang, hanya nama file yang dipakai
+                filename = part.filename.replace('\\', '/').rsplit('/', 1)[-1]
+                result = {'field': part.name, 'filename': filename}
+                if (not filename or filename in ('.', '..') or filename.startswith(UPLOAD_TEMP_PREFIX)
+                        or has_control_chars(filename) or os.path.isdir(filename)):
+                    part.drain()
+                    result.update(status='ERROR', error='Invalid filename')
+                    results.append(result)
+                    continue
+                temp_path, received = self.write_temp_file(part)
+                try:
+                    self.commit_upload(temp_path, filename)
+                except (OSError, ValueError) as e:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    result.update(status='ERROR', error=str(e))
+                else:
+                    result.update(status='OK', size=received)
+                results.append(result)
+        except ValueError as e:
+            # body terpotong atau rusak: file yang sudah lengkap tetap tersimpan
+            return self.create_response(400, 'Bad Request', json.dumps({'error': f'Invalid multipart body: {str(e)}',
+                                                                        'files': results}),
+                                        {'Content-type': 'application/json'})
+        except Exception as e:
+            access_logger.error('upload failed', error=str(e))
+            return self.create_response(500, 'Internal Server Error', json.dumps({'error': f'Upload failed: {str(e)}',
+                                                                                  'files': results}),
+                                        {'Content-type': 'application/json'})
+
+        uploaded = sum(1 for result in results if result['status'] == 'OK')
+        if not uploaded:
+            return self.create_response(400, 'Bad Request', json.dumps({'error': 'No files uploaded', 'files': results}),
+                                        {'Content-type': 'application/json'})
+        return self.create_response(200, 'OK', json.dumps({'files': results}), {'Content-type': 'application/json'})
     
     def delete_file(self, filename):
         try:
@@ -178,7 +939,8 @@ class HttpServer:
 
             if os.path.exists(file_path) and os.path.isfile(file_path):
                 os.remove(file_path)
-                print(f"File deleted: {filename}")
+                self.forget_file(file_path)
+                access_logger.info('file deleted', file=filename)
                 return self.create_response(200, 'OK', f'File {filename} deleted successfully.\n', 
                                            {'Content-type': 'text/plain'})
             else:
@@ -186,37 +948,109 @@ class HttpServer:
                                            {'Content-type': 'text/plain'})
 
         except Exception as e:
-            self.logger.error(f"Error deleting file {filename}: {str(e)}")
+            access_logger.error('delete failed', file=filename, error=str(e))
             return self.create_response(500, 'Internal Server Error', f'Delete failed: {str(e)}', 
                                        {'Content-type': 'text/plain'})
 
-    def list_directory(self, path):
+    def get_directory_snapshot(self, path):
+        """Sorted (name, size, mtime_ns) entries and their names, rebuilt when the directory mtime changes"""
+        dir_mtime = os.stat(path).st_mtime_ns
+        snapshot = self.directory_snapshot
+        if snapshot and snapshot[0] == (path, dir_mtime):
+            return snapshot[1], snapshot[2]
+
+        with self.directory_lock:
+            snapshot = self.directory_snapshot
+            if snapshot and snapshot[0] == (path, dir_mtime):
+                return snapshot[1], snapshot[2]
+            entries = []
+            with os.scandir(path) as scanner:
+                for entry in scanner:
+                    if entry.name.startswith(UPLOAD_TEMP_PREFIX):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        entry_stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.name, entry_stat.st_size, entry_stat.st_mtime_ns))
+            entries.sort()
+            names = [entry[0] for entry in entries]
+            self.directory_snapshot = ((path, dir_mtime), entries, names)
+            return entries, names
+
+    def list_directory(self, path, query=None):
+        query = query or {}
+        response_format = query.get('format', ['text'])[0]
+        prefix = query.get('prefix', [''])[0]
+        cursor = query.get('cursor', [None])[0]
+        limit = query.get('limit', [None])[0]
+
+        if response_format not in ('text', 'json'):
+            return self.create_response(400, 'Bad Request', f'Unknown list format {response_format}', 
+                                       {'Content-type': 'text/plain'})
         try:
-            files = os.listdir(path)
-            file_list = []
-            
-            for filename in files:
-                file_path = os.path.join(path, filename)
-                if os.path.isfile(file_path):
-                    file_list.append(filename)
-            
-            if not file_list:
-                content = "No files found in directory"
-            else:
-                content = "\n".join(file_list)
-                
-            headers = {'Content-type': 'text/plain'}
-            return self.create_response(200, 'OK', content, headers)
+            if limit is not None:
+                limit = min(int(limit), LIST_MAX_LIMIT)
+                if limit <= 0:
+                    raise ValueError(limit)
+            elif response_format == 'json':
+                limit = LIST_DEFAULT_LIMIT
+            # cursor = nama file terakhir di halaman sebelumnya, di-encode supaya aman di URL
+            after = base64.b64decode(cursor, altchars=b'-_', validate=True).decode() if cursor else None
+        except ValueError:
+            return self.create_response(400, 'Bad Request', 'Invalid limit or cursor', 
+                                       {'Content-type': 'text/plain'})
 
+        try:
+            entries, names = self.get_directory_snapshot(path)
         except Exception as e:
-            self.logger.error(f"Error listing directory {path}: {str(e)}")
+            access_logger.error('list failed', path=path, error=str(e))
             return self.create_response(500, 'Internal Server Error', f'Directory listing failed: {str(e)}', 
                                        {'Content-type': 'text/plain'})
 
+        # entries terurut, awal halaman dan batas prefix dicari dengan bisect
+        start = bisect.bisect_left(names, prefix)
+        if after is not None:
+            start = max(start, bisect.bisect_right(names, after))
+        end = len(names)
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            end = bisect.bisect_left(names, upper, start)
+        next_cursor = None
+        if limit is not None and end - start > limit:
+            end = start + limit
+            next_cursor = base64.urlsafe_b64encode(names[end - 1].encode()).decode()
+
+        headers = {'Content-type': 'text/plain'}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+
+        if response_format == 'json':
+            files = [{'name': name, 'size': size, 'mtime': mtime_ns // 1_000_000_000,
+                      'etag': file_etag(size, mtime_ns)} for name, size, mtime_ns in entries[start:end]]
+            headers['Content-type'] = 'application/json'
+            return self.create_response(200, 'OK', json.dumps({'files': files, 'next_cursor': next_cursor}),
+                                        headers)
+
+        response = self.create_response(200, 'OK', b'', headers)
+        response.attach_iter(self.iter_directory(names, start, end))
+        return response
+
+    def iter_directory(self, names, start, end):
+        if start >= end:
+            yield b"No files found in directory"
+            return
+        # direktori besar tidak dikumpulkan dulu ke satu string, nama file dikirim per batch
+        for batch_start in range(start, end, LIST_BATCH_SIZE):
+            batch = names[batch_start:min(batch_start + LIST_BATCH_SIZE, end)]
+            yield (("" if batch_start == start else "\n") + "\n".join(batch)).encode()
+
 def main():
     http_server = HttpServer()
     response = http_server.process_request('GET /perftest.sh HTTP/1.0')
-    print(response)
+    print(response.to_bytes())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
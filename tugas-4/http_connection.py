@@ -0,0 +1,383 @@
+import socket
+import select
+import time
+from http import parse_request, RequestParseError, MAX_HEADER_SIZE
+from http_metrics import registry as metrics
+from access_log import access_logger
+from socket_buffers import send_buffers
+
+"""
+* serve_connection melayani satu koneksi client sampai selesai, dipakai oleh
+server thread pool maupun process pool
+
+* mendukung HTTP/1.1 persistent connection: koneksi tetap dibuka setelah response
+kecuali client meminta Connection: close (atau HTTP/1.0 tanpa keep-alive),
+batas request per koneksi tercapai, atau koneksi idle melebihi idle_timeout
+
+* request yang di-pipeline (sudah ada di buffer setelah request sebelumnya)
+diproses berurutan tanpa menunggu recv berikutnya
+
+* header request di-parse sekali menjadi HttpRequest (lihat http.parse_request),
+header yang melebihi batas ditolak dengan 400/414/431 lalu koneksi ditutup
+
+* body request (Content-Length atau Transfer-Encoding: chunked) diberikan ke handler
+sebagai stream, response dari handler generator dikirim dengan chunked encoding
+
+* setiap koneksi dan request dicatat ke http_metrics.registry (dibaca lewat GET /metrics)
+dan ke access log (access_log.access_logger, satu baris per request)
+
+* header request harus lengkap dalam header_timeout sejak byte pertamanya (total, tidak
+diperpanjang per recv dan tetap berjalan saat koneksi berpindah thread), lewat dari itu
+dijawab 408 lalu koneksi ditutup (proteksi slowloris)
+
+* response dikirim sebagai daftar buffer (header, body, framing chunk) dengan socket.sendmsg,
+body di memori tidak pernah digabung (disalin) dengan header sebelum dikirim
+"""
+
+REQUEST_TIMEOUT = 30.0
+HEADER_TIMEOUT = 10.0
+KEEP_ALIVE_TIMEOUT = 5.0
+KEEP_ALIVE_MAX_REQUESTS = 100
+RECV_SIZE = 65536
+DRAIN_LIMIT = 1024 * 1024
+MAX_CHUNK_LINE = 4096
+
+
+class BodyReader:
+    """Interface body request untuk handler: readinto(), read(), drain(), complete dan leftover"""
+
+    # jumlah byte body yang sudah diberikan ke handler (untuk metrik)
+    received = 0
+
+    def read(self, size=-1):
+        chunks = []
+        total = 0
+        scratch = memoryview(bytearray(RECV_SIZE))
+        while size < 0 or total < size:
+            limit = RECV_SIZE if size < 0 else min(RECV_SIZE, size - total)
+            n = self.readinto(scratch[:limit])
+            if not n:
+                break
+            chunks.append(bytes(scratch[:n]))
+            total += n
+        return b"".join(chunks)
+
+    def drain(self, limit=DRAIN_LIMIT):
+        """Discard the unread rest of the body, False if the connection can't be reused"""
+        scratch = memoryview(bytearray(RECV_SIZE))
+        discarded = 0
+        try:
+            while not self.complete:
+                n = self.readinto(scratch)
+                if not n:
+                    return self.complete
+                discarded += n
+                if discarded > limit:
+                    return False
+        except (socket.error, ValueError):
+            return False
+        return True
+
+
+class RequestBody(BodyReader):
+    """Body request dengan Content-Length, dibaca langsung dari socket dengan recv_into"""
+
+    def __init__(self, connection, buffer, content_length):
+        self.connection = connection
+        # bagian body yang sudah ikut terbaca bersama header
+        self.prefix = memoryview(buffer[:content_length])
+        # sisa buffer setelah body adalah awal dari request berikutnya (pipelining)
+        self.leftover = buffer[content_length:]
+        self.remaining = content_length
+
+    @property
+    def complete(self):
+        return self.remaining <= 0
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        size = min(len(buffer), self.remaining)
+        if self.prefix:
+            n = min(size, len(self.prefix))
+            buffer[:n] = self.prefix[:n]
+            self.prefix = self.prefix[n:]
+        else:
+            n = self.connection.recv_into(buffer, size)
+            if n == 0:
+                return 0
+        self.remaining -= n
+        self.received += n
+        return n
+
+    def drain(self, limit=DRAIN_LIMIT):
+        if self.remaining > limit:
+            return False
+        return super().drain(limit)
+
+
+class ChunkedRequestBody(BodyReader):
+    """Body request dengan Transfer-Encoding: chunked, di-decode sambil dibaca"""
+
+    def __init__(self, connection, buffer):
+        self.connection = connection
+        self.buffer = bytearray(buffer)
+        self.chunk_remaining = 0
+        self.expect_crlf = False
+        self.complete = False
+        self.leftover = b""
+
+    def fill_buffer(self):
+        data = self.connection.recv(RECV_SIZE)
+        if not data:
+            raise ValueError("Connection closed inside chunked body")
+        self.buffer += data
+
+    def read_line(self):
+        while True:
+            line_end = self.buffer.find(b"\r\n")
+            if line_end >= 0:
+                line = bytes(self.buffer[:line_end])
+                del self.buffer[:line_end + 2]
+                return line
+            if len(self.buffer) > MAX_CHUNK_LINE:
+                raise ValueError("Chunk size line too long")
+            self.fill_buffer()
+
+    def readinto(self, buffer):
+        if self.complete:
+            return 0
+
+        if self.chunk_remaining == 0:
+            if self.expect_crlf:
+                if self.read_line() != b"":
+                    raise ValueError("Missing CRLF after chunk data")
+                self.expect_crlf = False
+            size_line = self.read_line()
+            try:
+                # chunk extension setelah ';' diabaikan
+                chunk_size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise ValueError(f"Invalid chunk size line {size_line[:32]!r}")
+            if chunk_size < 0:
+                raise ValueError("Negative chunk size")
+            if chunk_size == 0:
+                # trailer diabaikan sampai baris kosong
+                while self.read_line() != b"":
+                    pass
+                self.complete = True
+                self.leftover = bytes(self.buffer)
+                self.buffer = bytearray()
+                return 0
+            self.chunk_remaining = chunk_size
+
+        size = min(len(buffer), self.chunk_remaining)
+        if self.buffer:
+            n = min(size, len(self.buffer))
+            buffer[:n] = self.buffer[:n]
+            del self.buffer[:n]
+        else:
+            n = self.connection.recv_into(buffer, size)
+            if n == 0:
+                raise ValueError("Connection closed inside chunked body")
+        self.chunk_remaining -= n
+        self.received += n
+        if self.chunk_remaining == 0:
+            self.expect_crlf = True
+        return n
+
+
+def send_response(connection, response):
+    """Body di memori dikirim bersama header dengan sendmsg, body file dikirim dengan sendfile
+    tanpa disalin ke user space
+
+    Returns the number of bytes written."""
+    if response.body_iter is not None and not (response.head_only or response.status_code == 304):
+        sent = send_buffers(connection, [response.head_bytes()])
+        for chunk in response.body_iter:
+            if not chunk:
+                continue
+            if response.chunked:
+                sent += send_buffers(connection, [b"%x\r\n" % len(chunk), chunk, b"\r\n"])
+            else:
+                sent += send_buffers(connection, [chunk])
+        if response.chunked:
+            sent += send_buffers(connection, [b"0\r\n\r\n"])
+        return sent
+
+    if response.file is None or response.head_only or response.status_code == 304:
+        return send_buffers(connection, response.buffers())
+
+    # header dan bagian bytes (boundary multipart) yang berurutan dikirim dalam satu sendmsg
+    pending = [response.head_bytes()]
+    sent = 0
+    for segment in response.file_segments:
+        if isinstance(segment, bytes):
+            pending.append(segment)
+        else:
+            sent += send_buffers(connection, pending)
+            pending = []
+            offset, length = segment
+            sent += connection.sendfile(response.file, offset, length)
+    return sent + send_buffers(connection, pending)
+
+
+def send_error(http_server, connection, error):
+    response = http_server.create_response(error.status_code, error.message, error.detail,
+                                           {'Content-type': 'text/plain'})
+    try:
+        return send_buffers(connection, response.buffers())
+    except socket.error:
+        return 0
+
+
+def record_rejected(address, error, elapsed_since, sent, received):
+    """Request rejected before it could be parsed, counted under method and route '-'"""
+    duration = time.perf_counter() - elapsed_since
+    metrics.request_started()
+    metrics.request_finished('-', '-', error.status_code, duration, sent, received)
+    access_logger.request(client=address, status=error.status_code, error=error.detail, sent=sent,
+                          received=received, duration_ms=round(duration * 1000, 3))
+
+
+def reject_header_timeout(http_server, connection, address, received):
+    error = RequestParseError(408, 'Request Timeout', 'Request header timeout')
+    record_rejected(address, error, time.perf_counter(), send_error(http_server, connection, error), received)
+
+
+def record_request(address, request, response, started, sent, received, reused):
+    duration = time.perf_counter() - started
+    status = response.status_code if response else 500
+    metrics.request_finished(request.method, request.route, status, duration, sent, received, reused)
+    access_logger.request(client=address, method=request.method, target=request.target, version=request.version,
+                          status=status, sent=sent, received=received, duration_ms=round(duration * 1000, 3))
+
+
+def wait_readable(connection, timeout):
+    if timeout <= 0:
+        return False
+    poller = select.poll()
+    poller.register(connection, select.POLLIN)
+    return bool(poller.poll(timeout * 1000))
+
+
+def serve_connection(http_server, connection, address, idle_timeout=KEEP_ALIVE_TIMEOUT,
+                     max_requests=KEEP_ALIVE_MAX_REQUESTS, request_timeout=REQUEST_TIMEOUT,
+                     profiling_hook=None, shutdown_event=None, header_timeout=HEADER_TIMEOUT):
+    metrics.connection_opened()
+    access_logger.debug('connection opened', client=address)
+    try:
+        serve_requests(http_server, connection, address, idle_timeout, max_requests, request_timeout,
+                       profiling_hook, shutdown_event, header_timeout=header_timeout)
+    finally:
+        metrics.connection_closed()
+        access_logger.debug('connection closed', client=address)
+
+
+def serve_requests(http_server, connection, address, idle_timeout, max_requests, request_timeout,
+                   profiling_hook, shutdown_event, buffer=b"", handled=0, release=None, linger=0.0,
+                   header_timeout=HEADER_TIMEOUT, header_started=None):
+    """Serve requests until the connection should be closed.
+
+    buffer/handled continue a connection that already has bytes read and requests served,
+    header_started (time.monotonic()) is when the first byte of the partial head in buffer
+    arrived. With release, the connection is handed back as release(buffer, handled,
+    header_started) instead of blocking in recv for the next request head (see
+    server_thread_pool_http.py), unless more bytes arrive within linger seconds.
+    """
+    while True:
+        # tunggu request berikutnya, koneksi idle hanya ditahan selama idle_timeout
+        header_end = buffer.find(b"\r\n\r\n")
+        while header_end < 0:
+            if len(buffer) > MAX_HEADER_SIZE:
+                error = RequestParseError(431, 'Request Header Fields Too Large', 'Request header too large')
+                record_rejected(address, error, time.perf_counter(), send_error(http_server, connection, error),
+                                len(buffer))
+                return
+            if buffer and header_started is None:
+                header_started = time.monotonic()
+            if release is not None and not wait_readable(connection, linger):
+                release(buffer, handled, header_started)
+                return
+            if buffer:
+                remaining = header_started + header_timeout - time.monotonic()
+                if remaining <= 0:
+                    reject_header_timeout(http_server, connection, address, len(buffer))
+                    return
+                connection.settimeout(remaining)
+            else:
+                connection.settimeout(idle_timeout if handled else request_timeout)
+            try:
+                data = connection.recv(RECV_SIZE)
+            except socket.timeout:
+                if buffer:
+                    reject_header_timeout(http_server, connection, address, len(buffer))
+                elif not handled:
+                    access_logger.error('socket timeout', client=address)
+                return
+            except socket.error as e:
+                access_logger.error('socket error', client=address, error=str(e))
+                return
+            if not data:
+                if buffer:
+                    access_logger.error('incomplete request', client=address)
+                return
+            # hanya bagian baru (ditambah 3 byte untuk CRLFCRLF yang terpotong) yang dicari ulang
+            scanned = max(0, len(buffer) - 3)
+            buffer += data
+            header_end = buffer.find(b"\r\n\r\n", scanned)
+
+        started = time.perf_counter()
+        header_started = None
+        try:
+            request = parse_request(buffer[:header_end])
+        except RequestParseError as e:
+            record_rejected(address, e, started, send_error(http_server, connection, e), header_end + 4)
+            return
+        buffer = buffer[header_end + 4:]
+
+        # body tidak ditampung di memori, handler membacanya langsung dari socket
+        connection.settimeout(request_timeout)
+        if request.chunked:
+            # Transfer-Encoding mengalahkan Content-Length
+            request.body = ChunkedRequestBody(connection, buffer)
+        else:
+            request.body = RequestBody(connection, buffer, request.content_length)
+
+        handled += 1
+        metrics.request_started()
+        sent = 0
+        response = None
+        try:
+            if profiling_hook and profiling_hook.active:
+                response = profiling_hook.run(http_server.process_request, request)
+            else:
+                response = http_server.process_request(request)
+
+            # body yang tidak dibaca handler harus dibuang dulu sebelum request berikutnya bisa dibaca
+            keep_alive = (request.keep_alive and handled < max_requests and request.body.drain()
+                          and not (shutdown_event and shutdown_event.is_set()))
+            buffer = request.body.leftover
+
+            if response.body_iter is not None:
+                # panjang body generator tidak diketahui: chunked untuk HTTP/1.1, HTTP/1.0 ditandai dengan close
+                response.chunked = request.version == 'HTTP/1.1'
+                keep_alive = keep_alive and response.chunked
+
+            response.keep_alive = keep_alive
+            if keep_alive:
+                response.headers['Keep-Alive'] = f"timeout={int(idle_timeout)}, max={max_requests - handled}"
+
+            try:
+                sent = send_response(connection, response)
+            except socket.error as e:
+                access_logger.error('send failed', client=address, error=str(e))
+                return
+            finally:
+                response.close()
+        finally:
+            record_request(address, request, response, started, sent, header_end + 4 + request.body.received,
+                           handled > 1)
+
+        if not keep_alive:
+            return
@@ -0,0 +1,290 @@
+import os
+import json
+import bisect
+import threading
+
+"""
+* metrik server HTTP untuk endpoint /metrics (format teks Prometheus)
+
+* pencatatan tidak memakai lock: setiap thread menulis ke ThreadStats miliknya sendiri,
+semua ThreadStats baru digabung saat /metrics di-scrape
+
+* server multi-process (server_process_pool_http.py) memanggil enable_sharing(dir)
+sebelum fork, setiap worker menulis snapshot-nya ke <dir>/<pid>.json setiap detik
+dan /metrics di worker mana pun menggabungkan semua snapshot tersebut
+"""
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PUBLISH_INTERVAL = 1.0
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# method lain (bebas dikirim client) digabung menjadi satu label supaya jumlah series terbatas
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'PATCH', 'CONNECT', 'TRACE'))
+OTHER_METHOD = 'other'
+
+COUNTERS = (
+    ('bytes_sent', 'http_sent_bytes_total', 'Response bytes written to clients'),
+    ('bytes_received', 'http_received_bytes_total', 'Request header and body bytes read from clients'),
+    ('connections_total', 'http_connections_total', 'Client connections accepted'),
+    ('keepalive_requests', 'http_keepalive_requests_total', 'Requests served on a reused keep-alive connection'),
+)
+GAUGES = (
+    ('in_flight', 'http_requests_in_flight', 'Requests currently being handled'),
+    ('open_connections', 'http_open_connections', 'Client connections currently open (active or idle keep-alive)'),
+)
+
+
+class ThreadStats:
+    """Counters owned and written by a single thread"""
+
+    __slots__ = ('requests', 'latency', 'bytes_sent', 'bytes_received', 'connections_total',
+                 'keepalive_requests', 'in_flight', 'open_connections')
+
+    def __init__(self):
+        self.requests = {}  # (method, route, status) -> count
+        self.latency = {}   # (method, route) -> [count per bucket..., +Inf, count, sum]
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connections_total = 0
+        self.keepalive_requests = 0
+        self.in_flight = 0
+        self.open_connections = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.thread_stats = []
+        self.gauge_callbacks = {}  # name -> (help, callable)
+        self.share_dir = None
+        self.publisher = None
+        self.stop_publishing = threading.Event()
+
+    def reset_after_fork(self):
+        # statistik parent tidak ikut dihitung di worker hasil fork
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.thread_stats = []
+        self.gauge_callbacks = {}
+        self.publisher = None
+        self.stop_publishing = threading.Event()
+
+    def stats(self):
+        stats = getattr(self.local, 'stats', None)
+        if stats is None:
+            stats = self.local.stats = ThreadStats()
+            with self.lock:
+                self.thread_stats.append(stats)
+        return stats
+
+    def add_gauge(self, name, help_text, callback):
+        """Gauge computed at scrape time, e.g. executor queue depth"""
+        self.gauge_callbacks[name] = (help_text, callback)
+
+    # pencatatan, dipanggil dari thread yang melayani koneksi
+
+    def connection_opened(self):
+        stats = self.stats()
+        stats.connections_total += 1
+        stats.open_connections += 1
+
+    def connection_closed(self):
+        self.stats().open_connections -= 1
+
+    def request_started(self):
+        self.stats().in_flight += 1
+
+    def request_finished(self, method, route, status, duration, bytes_sent, bytes_received, reused=False):
+        stats = self.stats()
+        stats.in_flight -= 1
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+        key = (method, route, status)
+        stats.requests[key] = stats.requests.get(key, 0) + 1
+        latency = stats.latency.get((method, route))
+        if latency is None:
+            latency = stats.latency[(method, route)] = [0] * (len(LATENCY_BUCKETS) + 3)
+        latency[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        latency[-2] += 1
+        latency[-1] += duration
+        stats.bytes_sent += bytes_sent
+        stats.bytes_received += bytes_received
+        if reused:
+            stats.keepalive_requests += 1
+
+    # snapshot dan penggabungan
+
+    def snapshot(self):
+        """Merge the per-thread counters of this process"""
+        with self.lock:
+            thread_stats = list(self.thread_stats)
+        requests = {}
+        latency = {}
+        totals = dict.fromkeys([field for field, _, _ in COUNTERS + GAUGES], 0)
+        for stats in thread_stats:
+            # copy() adalah satu operasi atomik, aman walaupun thread pemilik sedang menulis
+            for key, count in stats.requests.copy().items():
+                requests[key] = requests.get(key, 0) + count
+            for key, values in stats.latency.copy().items():
+                merge_latency(latency, key, list(values))
+            for field in totals:
+                totals[field] += getattr(stats, field)
+
+        gauges = {}
+        for name, (_, callback) in list(self.gauge_callbacks.items()):
+            try:
+                gauges[name] = callback()
+            except Exception:
+                gauges[name] = 0
+        return {
+            'pid': os.getpid(),
+            'requests': [[*key, count] for key, count in requests.items()],
+            'latency': [[*key, values] for key, values in latency.items()],
+            'totals': totals,
+            'gauges': gauges,
+        }
+
+    def enable_sharing(self, share_dir):
+        self.share_dir = share_dir
+
+    def start_publishing(self):
+        if not self.share_dir or self.publisher:
+            return
+        self.publisher = threading.Thread(target=self.publish_loop, name='metrics-publisher', daemon=True)
+        self.publisher.start()
+
+    def publish(self):
+        path = os.path.join(self.share_dir, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as fp:
+            json.dump(self.snapshot(), fp)
+        os.replace(temp_path, path)
+
+    def publish_loop(self):
+        while not self.stop_publishing.wait(PUBLISH_INTERVAL):
+            try:
+                self.publish()
+            except OSError:
+                pass
+
+    def collect(self):
+        """Snapshots of this process and, when sharing, of every other process"""
+        snapshots = [self.snapshot()]
+        if not self.share_dir:
+            return snapshots
+        try:
+            names = os.listdir(self.share_dir)
+        except OSError:
+            return snapshots
+        for name in names:
+            if not name.endswith('.json') or name == f"{os.getpid()}.json":
+                continue
+            try:
+                with open(os.path.join(self.share_dir, name)) as fp:
+                    snapshot = json.load(fp)
+            except (OSError, ValueError):
+                continue
+            if not process_alive(snapshot['pid']):
+                # counter proses yang sudah mati tetap dihitung, gauge-nya tidak
+                snapshot['gauges'] = {}
+                for field, _, _ in GAUGES:
+                    snapshot['totals'][field] = 0
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self):
+        snapshots = self.collect()
+        requests = {}
+        latency = {}
+        totals = dict.fromkeys([field for field, _, _ in COUNTERS + GAUGES], 0)
+        gauges = {}
+        for snapshot in snapshots:
+            for method, route, status, count in snapshot['requests']:
+                key = (method, route, status)
+                requests[key] = requests.get(key, 0) + count
+            for method, route, values in snapshot['latency']:
+                merge_latency(latency, (method, route), values)
+            for field in totals:
+                totals[field] += snapshot['totals'].get(field, 0)
+            for name, value in snapshot['gauges'].items():
+                gauges[name] = gauges.get(name, 0) + value
+
+        lines = [
+            "# HELP http_requests_total Requests handled, by method, route and status",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'http_requests_total{{method="{escape(method)}",route="{escape(route)}",'
+                         f'status="{status}"}} {count}')
+
+        lines.append("# HELP http_request_duration_seconds Time from parsed request head to response sent")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), values in sorted(latency.items()):
+            labels = f'method="{escape(method)}",route="{escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, values):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {values[-1]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {values[-2]}')
+
+        for field, name, help_text in COUNTERS:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {totals[field]}"]
+        for field, name, help_text in GAUGES:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {totals[field]}"]
+        for name, value in sorted(gauges.items()):
+            help_text = self.gauge_callbacks.get(name, (name,))[0]
+            lines += [f"# HELP http_{name} {help_text}", f"# TYPE http_{name} gauge", f"http_{name} {value}"]
+        lines += ["# HELP http_metrics_processes Processes included in this scrape",
+                  "# TYPE http_metrics_processes gauge", f"http_metrics_processes {len(snapshots)}"]
+        return "\n".join(lines) + "\n"
+
+
+class QueueDepth:
+    """Tasks handed to an executor that no thread has started yet (gauge source)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.depth = 0
+
+    def track(self, func):
+        """Count func as queued now, wrapped so the count drops when a thread starts it"""
+        with self.lock:
+            self.depth += 1
+
+        def run(*args):
+            with self.lock:
+                self.depth -= 1
+            return func(*args)
+        return run
+
+    def value(self):
+        return self.depth
+
+
+def merge_latency(latency, key, values):
+    merged = latency.get(key)
+    if merged is None:
+        latency[key] = values
+    else:
+        for i, value in enumerate(values):
+            merged[i] += value
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = MetricsRegistry()
+os.register_at_fork(after_in_child=registry.reset_after_fork)
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import contextlib
+import logging
+from access_log import access_logger
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.microbenchmark import format_size, measure, compare_with_baseline  # noqa: E402
+
+"""
+* microbenchmark in-process (tanpa socket) untuk hot path HttpServer:
+parse_request, process_request, create_response dan handle_get untuk file kecil dan besar
+
+* setiap case di-warmup, lalu diukur berulang kali (ns/op = median dari beberapa repeat),
+alokasi per operasi diukur terpisah dengan tracemalloc (peak bytes selama satu operasi),
+lihat common/microbenchmark.py
+
+* hasil bisa disimpan sebagai baseline JSON (--save-baseline) dan dibandingkan
+pada run berikutnya (--compare), exit code 1 jika ada regresi di atas --threshold
+"""
+
+
+def render(response):
+    # buffer yang sama dengan yang dikirim send_response lewat sendmsg (tanpa digabung)
+    buffers = response.buffers()
+    response.close()
+    return buffers
+
+
+def build_cases(file_sizes):
+    from http import HttpServer, HttpHeaders, parse_request
+
+    http_server = HttpServer()
+    cases = []
+
+    for size in file_sizes:
+        with open(f"bench_{format_size(size)}.bin", 'wb') as fp:
+            fp.write(os.urandom(size))
+
+    small_body = 'santai saja'
+    large_body = os.urandom(1024 * 1024)
+    upload_body = os.urandom(1024)
+    upload_head = f"POST /upload HTTP/1.0\r\nX-Filename: upload.bin\r\nContent-Length: {len(upload_body)}\r\n\r\n"
+
+    browser_head = (b"GET /santai HTTP/1.1\r\nHost: localhost:8885\r\nUser-Agent: Mozilla/5.0\r\n"
+                    b"Accept: text/html,application/xhtml+xml\r\nAccept-Encoding: gzip, deflate\r\n"
+                    b"Accept-Language: en-US,en;q=0.9\r\nConnection: keep-alive")
+    cases.append(('parse_request browser headers', lambda: parse_request(browser_head)))
+    cases.append(('create_response small', lambda: render(http_server.create_response(200, 'OK', small_body, {'Content-type': 'text/plain'}))))
+    cases.append(('create_response 1MB', lambda: render(http_server.create_response(200, 'OK', large_body, {'Content-type': 'application/octet-stream'}))))
+    cases.append(('process_request GET /santai', lambda: render(http_server.process_request("GET /santai HTTP/1.0\r\nHost: localhost\r\n\r\n"))))
+    cases.append(('process_request GET /', lambda: render(http_server.process_request("GET / HTTP/1.0\r\nHost: localhost\r\n\r\n"))))
+    cases.append(('process_request GET /list', lambda: render(http_server.process_request("GET /list HTTP/1.0\r\nHost: localhost\r\n\r\n"))))
+    cases.append(('process_request GET missing', lambda: render(http_server.process_request("GET /missing.bin HTTP/1.0\r\n\r\n"))))
+    cases.append(('process_request POST /upload 1KB', lambda: render(http_server.process_request(upload_head, upload_body))))
+
+    for size in file_sizes:
+        name = format_size(size)
+        request = f"GET /bench_{name}.bin HTTP/1.0\r\nHost: localhost\r\n\r\n"
+        cases.append((f"process_request GET {name}", lambda r=request: render(http_server.process_request(r))))
+        cases.append((f"handle_get {name}", lambda p=f"/bench_{name}.bin": render(http_server.handle_get(p, HttpHeaders()))))
+
+    return cases
+
+
+def main():
+    cmd_parser = argparse.ArgumentParser(description='HttpServer microbenchmark')
+    cmd_parser.add_argument('--file-sizes', type=int, nargs='+', default=[1024, 10 * 1024 * 1024],
+                            help='Static file sizes for GET in bytes (default: 1KB 10MB)')
+    cmd_parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per repeat (default: 0.2)')
+    cmd_parser.add_argument('--repeat', type=int, default=5, help='Number of timed repeats (default: 5)')
+    cmd_parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this text')
+    cmd_parser.add_argument('--save-baseline', metavar='FILE', help='Save results as a JSON baseline')
+    cmd_parser.add_argument('--compare', metavar='FILE', help='Compare results against a JSON baseline')
+    cmd_parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent (default: 10)')
+    args = cmd_parser.parse_args()
+
+    baseline_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        # HttpServer melayani file relatif terhadap working directory
+        os.chdir(work_dir)
+        cases = build_cases(args.file_sizes)
+        logging.disable(logging.CRITICAL)
+        access_logger.configure('off')
+        for name, operation in cases:
+            if args.filter not in name:
+                continue
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results[name] = measure(operation, None, args.min_time, args.repeat)
+            print(f"{name:40} {results[name]['ns_per_op']:14.0f} ns/op {results[name]['bytes_per_op']:12d} B/op",
+                  file=sys.stderr)
+        os.chdir('/')
+
+    regressions = []
+    if compare_path:
+        with open(compare_path) as fp:
+            regressions = compare_with_baseline(results, json.load(fp), args.threshold)
+
+    if baseline_path:
+        with open(baseline_path, 'w') as fp:
+            json.dump(results, fp, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+from urllib.parse import unquote
+
+"""
+* parser multipart/form-data (RFC 7578) yang streaming: body dibaca per blok dan
+data setiap part diberikan ke pemanggil sebelum boundary berikutnya ditemukan,
+sehingga memori yang dipakai hanya sebesar satu blok, bukan satu part atau seluruh body
+
+* pemakaian:
+    reader = MultipartReader(body, boundary)
+    for part in reader:            # part.headers, part.name, part.filename
+        n = part.readinto(buffer)  # 0 = akhir part
+"""
+
+READ_SIZE = 64 * 1024
+MAX_PART_HEADER_SIZE = 16 * 1024
+MAX_BOUNDARY_LENGTH = 70
+
+
+def parse_header_params(value):
+    """'form-data; name="a"; filename="b"' -> ('form-data', {'name': 'a', 'filename': 'b'})"""
+    head, _, rest = value.partition(";")
+    params = {}
+    i = 0
+    while i < len(rest):
+        while i < len(rest) and rest[i] in " \t;":
+            i += 1
+        eq = rest.find("=", i)
+        if eq < 0:
+            break
+        key = rest[i:eq].strip().lower()
+        i = eq + 1
+        if i < len(rest) and rest[i] == '"':
+            # quoted-string, backslash meng-escape karakter berikutnya
+            i += 1
+            chars = []
+            while i < len(rest) and rest[i] != '"':
+                if rest[i] == "\\" and i + 1 < len(rest):
+                    i += 1
+                chars.append(rest[i])
+                i += 1
+            i += 1
+            params[key] = "".join(chars)
+        else:
+            end = rest.find(";", i)
+            end = len(rest) if end < 0 else end
+            params[key] = rest[i:end].strip()
+            i = end
+    return head.strip().lower(), params
+
+
+def multipart_boundary(content_type):
+    """Boundary from a multipart/form-data Content-Type, None if it is not one"""
+    media_type, params = parse_header_params(content_type or "")
+    boundary = params.get('boundary')
+    if media_type != 'multipart/form-data' or not boundary or len(boundary) > MAX_BOUNDARY_LENGTH:
+        return None
+    return boundary.encode('latin-1')
+
+
+class MultipartPart:
+    def __init__(self, reader, headers):
+        self.reader = reader
+        self.headers = headers
+        disposition, params = parse_header_params(headers.get('content-disposition', ''))
+        self.name = params.get('name')
+        self.filename = params.get('filename')
+        # filename*=UTF-8''... (RFC 5987) lebih diutamakan jika ada
+        extended = params.get('filename*')
+        if extended and "''" in extended:
+            charset, _, encoded = extended.partition("''")
+            try:
+                self.filename = unquote(encoded, encoding=charset or 'utf-8', errors='strict')
+            except (LookupError, UnicodeDecodeError):
+                pass
+
+    def readinto(self, buffer):
+        return self.reader.read_part_into(self, buffer)
+
+    def drain(self):
+        scratch = memoryview(bytearray(READ_SIZE))
+        while self.readinto(scratch):
+            pass
+
+
+class MultipartReader:
+    def __init__(self, body, boundary, read_size=READ_SIZE):
+        self.body = body
+        # CRLF di depan supaya boundary pertama (tanpa preamble) dikenali dengan delimiter yang sama
+        self.delimiter = b"\r\n--" + boundary
+        self.buffer = bytearray(b"\r\n")
+        self.read_size = read_size
+        self.current = None
+        self.part_finished = True
+        self.finished = False
+
+    def fill(self):
+        data = self.body.read(self.read_size)
+        if not data:
+            raise ValueError("Unexpected end of multipart body")
+        self.buffer += data
+
+    def __iter__(self):
+        while True:
+            part = self.next_part()
+            if part is None:
+                return
+            yield part
+
+    def next_part(self):
+        if self.finished:
+            return None
+        if self.current is not None and not self.part_finished:
+            self.current.drain()
+
+        # buang sisa data (preamble) sampai delimiter, lalu lihat apakah ini delimiter penutup
+        while True:
+            position = self.buffer.find(self.delimiter)
+            if position >= 0:
+                del self.buffer[:position + len(self.delimiter)]
+                break
+            keep = len(self.delimiter) - 1
+            if len(self.buffer) > keep:
+                del self.buffer[:len(self.buffer) - keep]
+            self.fill()
+
+        while len(self.buffer) < 2:
+            self.fill()
+        if self.buffer[:2] == b"--":
+            self.finished = True
+            return None
+
+        while True:
+            header_end = self.buffer.find(b"\r\n\r\n")
+            if header_end >= 0:
+                break
+            if len(self.buffer) > MAX_PART_HEADER_SIZE:
+                raise ValueError("Multipart part headers too large")
+            self.fill()
+
+        header_lines = bytes(self.buffer[:header_end]).decode('utf-8', errors='replace').split("\r\n")
+        del self.buffer[:header_end + 4]
+        headers = {}
+        # baris pertama adalah sisa baris boundary (transport padding), dilewati
+        for line in header_lines[1:]:
+            key, colon, value = line.partition(":")
+            if colon:
+                headers[key.strip().lower()] = value.strip()
+
+        self.current = MultipartPart(self, headers)
+        self.part_finished = False
+        return self.current
+
+    def read_part_into(self, part, buffer):
+        if part is not self.current or self.part_finished:
+            return 0
+        while True:
+            position = self.buffer.find(self.delimiter)
+            if position >= 0:
+                available = position
+            else:
+                # ekor buffer bisa jadi awal delimiter yang belum lengkap, belum boleh diberikan
+                available = len(self.buffer) - (len(self.delimiter) - 1)
+            if available > 0:
+                n = min(available, len(buffer))
+                buffer[:n] = self.buffer[:n]
+                del self.buffer[:n]
+                return n
+            if position >= 0:
+                self.part_finished = True
+                return 0
+            self.fill()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+"""
+* implementasi ProfilingHook ada di common/profiling_hook.py (dipakai bersama
+tugas-4 dan tugas-ets), modul ini hanya meneruskan import supaya
+`from profiling_hook import ProfilingHook` tetap berlaku di direktori ini
+"""
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.profiling_hook import *  # noqa: E402,F401,F403
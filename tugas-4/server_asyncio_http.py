@@ -0,0 +1,337 @@
+import socket
+import asyncio
+import logging
+import signal
+import argparse
+import resource
+import time
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from http import HttpServer, parse_request, RequestParseError, MAX_HEADER_SIZE
+from http_connection import (RequestBody, ChunkedRequestBody, REQUEST_TIMEOUT, HEADER_TIMEOUT, RECV_SIZE,
+                             KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_REQUESTS, record_rejected, record_request)
+from profiling_hook import ProfilingHook
+from http_metrics import registry as metrics, QueueDepth
+from access_log import access_logger
+
+"""
+* server HTTP ketiga berbasis asyncio streams, handler sama dengan server thread pool
+dan process pool (HttpServer)
+
+* parsing request dan penulisan response berjalan di event loop, sehingga koneksi
+keep-alive yang idle hanya memakan satu coroutine, bukan satu thread
+
+* handler (file I/O, upload) dijalankan di ThreadPoolExecutor yang dibatasi, jumlah
+pekerjaan yang mengantri dibatasi oleh semaphore supaya antrian tidak tumbuh tanpa batas
+
+* body request dibaca handler lewat StreamConnection, adapter recv/recv_into blocking
+di thread executor di atas StreamReader milik event loop
+"""
+
+http_server = HttpServer()
+logger = None
+keep_alive_timeout = KEEP_ALIVE_TIMEOUT
+keep_alive_max = KEEP_ALIVE_MAX_REQUESTS
+header_timeout = HEADER_TIMEOUT
+max_workers = 50
+profiling_hook = ProfilingHook('server_asyncio_http')
+
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(message)s'
+    )
+    return logging.getLogger(__name__)
+
+
+class StreamConnection:
+    """Socket-like recv()/recv_into() for handler threads, backed by the loop's StreamReader"""
+
+    def __init__(self, reader, loop, timeout=REQUEST_TIMEOUT):
+        self.reader = reader
+        self.loop = loop
+        self.timeout = timeout
+
+    def recv(self, size):
+        future = asyncio.run_coroutine_threadsafe(self.reader.read(size), self.loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise socket.timeout("timed out reading request body")
+
+    def recv_into(self, buffer, size=0):
+        data = self.recv(size or len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class AsyncHttpServer:
+    def __init__(self, http_server, executor, max_pending, idle_timeout=KEEP_ALIVE_TIMEOUT,
+                 max_requests=KEEP_ALIVE_MAX_REQUESTS, request_timeout=REQUEST_TIMEOUT,
+                 header_timeout=HEADER_TIMEOUT):
+        self.http_server = http_server
+        self.executor = executor
+        # batas pekerjaan di executor (berjalan + mengantri)
+        self.pending = asyncio.Semaphore(max_pending)
+        self.idle_timeout = idle_timeout
+        self.max_requests = max_requests
+        self.request_timeout = request_timeout
+        self.header_timeout = header_timeout
+        self.shutting_down = False
+        self.connections = set()
+        self.queue_depth = QueueDepth()
+
+    async def run_in_executor(self, func, *args):
+        async with self.pending:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.queue_depth.track(func), *args)
+
+    def handle_request(self, request):
+        """Runs in an executor thread: handler plus discarding the unread body"""
+        if profiling_hook.active:
+            response = profiling_hook.run(self.http_server.process_request, request)
+        else:
+            response = self.http_server.process_request(request)
+        return response, request.body.drain()
+
+    async def send_error(self, writer, error):
+        response = self.http_server.create_response(error.status_code, error.message, error.detail,
+                                                    {'Content-type': 'text/plain'})
+        data = response.to_bytes()
+        writer.write(data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            return 0
+        return len(data)
+
+    async def write_response(self, writer, response):
+        """Returns the number of bytes written"""
+        loop = asyncio.get_running_loop()
+        head = response.head_bytes()
+        sent = len(head)
+        if response.head_only or response.status_code == 304:
+            writer.write(head)
+        elif response.body_iter is not None:
+            writer.write(head)
+            body_iter = iter(response.body_iter)
+            while True:
+                # generator bisa melakukan I/O (mis. scandir), jadi diambil di executor
+                chunk = await self.run_in_executor(next, body_iter, None)
+                if chunk is None:
+                    break
+                if not chunk:
+                    continue
+                if response.chunked:
+                    writer.writelines([b"%x\r\n" % len(chunk), chunk, b"\r\n"])
+                    sent += len(chunk) + len(b"%x" % len(chunk)) + 4
+                else:
+                    writer.write(chunk)
+                    sent += len(chunk)
+                await writer.drain()
+            if response.chunked:
+                writer.write(b"0\r\n\r\n")
+                sent += 5
+        elif response.file is None:
+            # header dan body sebagai buffer terpisah, transport menulisnya dengan sendmsg (Python 3.12+)
+            buffers = response.buffers(head)
+            writer.writelines(buffers)
+            sent = sum(len(buffer) for buffer in buffers)
+        else:
+            writer.write(head)
+            for segment in response.file_segments:
+                if isinstance(segment, bytes):
+                    writer.write(segment)
+                    sent += len(segment)
+                else:
+                    offset, length = segment
+                    await writer.drain()
+                    sent += await loop.sendfile(writer.transport, response.file, offset, length)
+        await writer.drain()
+        return sent
+
+    async def serve_stream(self, reader, writer):
+        address = writer.get_extra_info('peername')
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        self.connections.add(task)
+        metrics.connection_opened()
+        access_logger.debug('connection opened', client=address)
+        buffer = b""
+        handled = 0
+        header_started = None
+
+        try:
+            while True:
+                # tunggu request berikutnya, koneksi idle hanya ditahan selama idle_timeout
+                header_end = buffer.find(b"\r\n\r\n")
+                while header_end < 0:
+                    if len(buffer) > MAX_HEADER_SIZE:
+                        error = RequestParseError(431, 'Request Header Fields Too Large', 'Request header too large')
+                        record_rejected(address, error, time.perf_counter(), await self.send_error(writer, error),
+                                        len(buffer))
+                        return
+                    if buffer:
+                        # deadline header total sejak byte pertamanya, tidak diperpanjang per read()
+                        if header_started is None:
+                            header_started = time.monotonic()
+                        timeout = max(0, header_started + self.header_timeout - time.monotonic())
+                    else:
+                        timeout = self.idle_timeout if handled else self.request_timeout
+                    try:
+                        data = await asyncio.wait_for(reader.read(RECV_SIZE), timeout)
+                    except asyncio.TimeoutError:
+                        if buffer:
+                            error = RequestParseError(408, 'Request Timeout', 'Request header timeout')
+                            record_rejected(address, error, time.perf_counter(), await self.send_error(writer, error),
+                                            len(buffer))
+                        elif not handled:
+                            access_logger.error('socket timeout', client=address)
+                        return
+                    if not data:
+                        if buffer:
+                            access_logger.error('incomplete request', client=address)
+                        return
+                    scanned = max(0, len(buffer) - 3)
+                    buffer += data
+                    header_end = buffer.find(b"\r\n\r\n", scanned)
+
+                started = time.perf_counter()
+                header_started = None
+                try:
+                    request = parse_request(buffer[:header_end])
+                except RequestParseError as e:
+                    record_rejected(address, e, started, await self.send_error(writer, e), header_end + 4)
+                    return
+                buffer = buffer[header_end + 4:]
+
+                connection = StreamConnection(reader, loop, self.request_timeout)
+                if request.chunked:
+                    request.body = ChunkedRequestBody(connection, buffer)
+                else:
+                    request.body = RequestBody(connection, buffer, request.content_length)
+
+                handled += 1
+                metrics.request_started()
+                sent = 0
+                response = None
+                try:
+                    response, drained = await self.run_in_executor(self.handle_request, request)
+                    buffer = request.body.leftover
+
+                    keep_alive = (request.keep_alive and handled < self.max_requests and drained
+                                  and not self.shutting_down)
+                    if response.body_iter is not None:
+                        response.chunked = request.version == 'HTTP/1.1'
+                        keep_alive = keep_alive and response.chunked
+
+                    response.keep_alive = keep_alive
+                    if keep_alive:
+                        response.headers['Keep-Alive'] = f"timeout={int(self.idle_timeout)}, max={self.max_requests - handled}"
+
+                    try:
+                        sent = await self.write_response(writer, response)
+                    except (ConnectionError, OSError) as e:
+                        access_logger.error('send failed', client=address, error=str(e))
+                        return
+                    finally:
+                        response.close()
+                finally:
+                    record_request(address, request, response, started, sent,
+                                   header_end + 4 + request.body.received, handled > 1)
+
+                if not keep_alive:
+                    return
+        except Exception as e:
+            access_logger.error('connection failed', client=address, error=str(e))
+        finally:
+            self.connections.discard(task)
+            metrics.connection_closed()
+            access_logger.debug('connection closed', client=address)
+            writer.close()
+
+
+def raise_fd_limit():
+    # ribuan koneksi keep-alive berarti ribuan fd terbuka
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+async def start_server(port):
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+    profiling_hook.install()
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        async_server = AsyncHttpServer(http_server, executor, max_workers * 4,
+                                       keep_alive_timeout, keep_alive_max, header_timeout=header_timeout)
+        metrics.add_gauge('executor_queue_depth', 'Handler calls waiting for an executor thread',
+                          async_server.queue_depth.value)
+        try:
+            server = await asyncio.start_server(async_server.serve_stream, '0.0.0.0', port,
+                                                reuse_address=True, backlog=1024)
+        except OSError as e:
+            if e.errno == 98:
+                logger.error(f"Port {port} is already in use")
+            else:
+                logger.error(f"Socket error: {e}")
+            return
+
+        print(f"Asyncio HTTP Server started on 0.0.0.0:{port}")
+        print(f"Max executor threads: {max_workers}, open file limit: {raise_fd_limit()}")
+
+        await stop_event.wait()
+        logger.info("Server shutting down...")
+        async_server.shutting_down = True
+        server.close()
+        await server.wait_closed()
+
+        if async_server.connections:
+            logger.info(f"Waiting for {len(async_server.connections)} active connections...")
+            done, pending = await asyncio.wait(list(async_server.connections), timeout=30)
+            for task in pending:
+                task.cancel()
+        logger.info("Server stopped")
+
+
+def main():
+    global logger, keep_alive_timeout, keep_alive_max, header_timeout, max_workers
+    cmd_parser = argparse.ArgumentParser(description='Asyncio HTTP Server')
+    cmd_parser.add_argument('--port', type=int, default=8887, help='Listen port (default: 8887)')
+    cmd_parser.add_argument('--workers', type=int, default=50,
+                            help='Executor threads for handlers and file I/O (default: 50)')
+    cmd_parser.add_argument('--profile-dir', default='profiles',
+                            help='Output directory for SIGUSR1/SIGUSR2 captures (default: ./profiles)')
+    cmd_parser.add_argument('--profile-seconds', type=float, default=30, help='Stop a capture after N seconds (default: 30)')
+    cmd_parser.add_argument('--profile-requests', type=int, default=None, help='Stop a capture after N requests')
+    cmd_parser.add_argument('--keep-alive-timeout', type=float, default=KEEP_ALIVE_TIMEOUT,
+                            help=f'Close idle keep-alive connections after N seconds (default: {KEEP_ALIVE_TIMEOUT})')
+    cmd_parser.add_argument('--keep-alive-max', type=int, default=KEEP_ALIVE_MAX_REQUESTS,
+                            help=f'Maximum requests per connection (default: {KEEP_ALIVE_MAX_REQUESTS})')
+    cmd_parser.add_argument('--header-timeout', type=float, default=HEADER_TIMEOUT,
+                            help=f'Close connections whose request head is not complete N seconds after its '
+                                 f'first byte (default: {HEADER_TIMEOUT})')
+    access_logger.add_arguments(cmd_parser)
+    cmd_args = cmd_parser.parse_args()
+    access_logger.configure_from_args(cmd_args)
+
+    logger = setup_logging()
+    profiling_hook.output_dir = cmd_args.profile_dir
+    profiling_hook.duration = cmd_args.profile_seconds
+    profiling_hook.max_requests = cmd_args.profile_requests
+    keep_alive_timeout = cmd_args.keep_alive_timeout
+    keep_alive_max = cmd_args.keep_alive_max
+    header_timeout = cmd_args.header_timeout
+    max_workers = cmd_args.workers
+    asyncio.run(start_server(cmd_args.port))
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,74 @@
+import os
+import errno
+import fcntl
+import shutil
 import socket
 import time
 import logging
 import signal
+import selectors
 import threading
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import tempfile
+import multiprocessing
+import multiprocessing.connection
+from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
+from http_connection import serve_connection, KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_REQUESTS, HEADER_TIMEOUT
+from profiling_hook import ProfilingHook
+from http_metrics import registry as metrics, QueueDepth
+from access_log import access_logger
+
+"""
+* worker process dibuat sekali saat start dan tetap hidup (warm): HttpServer dibangun
+sekali per worker, bukan per koneksi
+
+* parent menjalankan accept loop, fd koneksi client dikirim ke worker lewat Unix
+socket (socket.send_fds), tanpa pickle socket
+
+* parent memilih worker dengan koneksi aktif paling sedikit (least-loaded), worker
+melapor setiap koneksi selesai lewat channel yang sama
+
+* worker melayani beberapa koneksi sekaligus dengan thread pool kecil, worker yang
+mati di-restart oleh parent
+
+* mode --mode reuseport (prefork): setiap worker bind sendiri ke port 8889 dengan
+SO_REUSEPORT dan menjalankan accept loop sendiri, kernel yang membagi koneksi ke
+worker sehingga parent tidak menjadi bottleneck; parent hanya mengawasi worker
+(restart jika crash) dan meneruskan SIGTERM untuk graceful shutdown
+
+* GET /metrics di worker mana pun berisi metrik gabungan semua worker: parent membuat
+direktori sementara sebelum fork, setiap worker menulis snapshot metriknya ke sana
+(lihat http_metrics.enable_sharing)
+"""
 
 shutdown_event = threading.Event()
 server_socket = None
 logger = None
+keep_alive_timeout = KEEP_ALIVE_TIMEOUT
+keep_alive_max = KEEP_ALIVE_MAX_REQUESTS
+header_timeout = HEADER_TIMEOUT
+worker_count = os.cpu_count() or 4
+worker_threads = 16
+workers = []
+profiling_hook = ProfilingHook('server_process_pool_http')
+# koneksi di worker yang sudah di-submit ke thread pool tetapi belum mulai dilayani
+queue_depth = QueueDepth()
+
+CONNECTION_DONE = b"d"
+EXIT_BIND_FAILED = 3
+PORT = 8889
+
+
+class WorkerHandle:
+    """Parent-side view of one worker: process, fd channel and active connection count"""
+
+    def __init__(self, index, process, channel):
+        self.index = index
+        self.process = process
+        self.channel = channel
+        self.active = 0
+
 
 def setup_logging():
     logging.basicConfig(
@@ -23,184 +83,308 @@ def signal_handler(signum, frame):
     else:
         print(f"Received signal {signum}, shutting down gracefully...")
     shutdown_event.set()
-    if server_socket:
-        server_socket.close()
 
-def process_client(connection_info):
-    connection, address = connection_info
-    http_server = HttpServer()
-    
+def process_client(http_server, connection, address, channel):
     try:
-        connection.settimeout(30.0)
-        
-        header_data = b""
-        start_time = time.time()
-        
-        while b"\r\n\r\n" not in header_data:
-            if time.time() - start_time > 30:
-                print(f"Request timeout from {address}")
-                return
-                
+        serve_connection(http_server, connection, address, keep_alive_timeout, keep_alive_max,
+                         profiling_hook=profiling_hook, shutdown_event=shutdown_event,
+                         header_timeout=header_timeout)
+    except Exception as e:
+        access_logger.error('connection failed', client=address, error=str(e))
+    finally:
+        try:
+            connection.close()
+        except:
+            pass
+        if channel:
             try:
-                data = connection.recv(1024)
-                if not data:
-                    break
-                header_data += data
-            except socket.timeout:
-                print(f"Socket timeout from {address}")
-                return
-            except socket.error as e:
-                print(f"Socket error from {address}: {e}")
-                return
-
-        if b"\r\n\r\n" not in header_data:
-            print(f"Incomplete request from {address}")
-            return
+                channel.send(CONNECTION_DONE)
+            except OSError:
+                pass
+
+def worker_main(index, channel, inherited_sockets):
+    # socket milik parent (listen socket, channel worker lain) ikut ter-fork, harus ditutup
+    # supaya EOF di channel worker lain tetap terdeteksi
+    for inherited in inherited_sockets:
+        inherited.close()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    http_server = HttpServer()
+    with ThreadPoolExecutor(worker_threads) as executor:
+        start_worker_metrics(executor)
+        while True:
+            try:
+                message, fds, _, _ = socket.recv_fds(channel, 1024, 1)
+            except OSError:
+                break
+            if not message:
+                # parent menutup channel: selesaikan koneksi yang sedang berjalan lalu keluar
+                break
+            host, _, port = message.decode().rpartition(" ")
+            for fd in fds:
+                connection = socket.socket(fileno=fd)
+                executor.submit(queue_depth.track(process_client), http_server, connection, (host, int(port)), channel)
+        shutdown_event.set()
+    channel.close()
+    finish_worker()
 
-        header_end_pos = header_data.find(b"\r\n\r\n") + 4
-        header_bytes_only = header_data[:header_end_pos]
-        body = header_data[header_end_pos:]
+def start_worker_metrics(executor):
+    metrics.add_gauge('executor_queue_depth', 'Connections waiting for a worker thread', queue_depth.value)
+    metrics.start_publishing()
 
+def finish_worker():
+    # counter worker yang berhenti tetap ikut dihitung oleh worker lain
+    if metrics.share_dir:
         try:
-            headers_text = header_bytes_only.decode('utf-8')
-        except UnicodeDecodeError:
-            print(f"Invalid UTF-8 in headers from {address}")
-            return
+            metrics.publish()
+        except OSError:
+            pass
+    # worker multiprocessing keluar dengan os._exit (tanpa atexit), sisa access log di-flush di sini
+    access_logger.stop()
 
-        header_lines = headers_text.split("\r\n")
+def spawn_worker(index):
+    parent_channel, worker_channel = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    inherited_sockets = [server_socket, parent_channel] + [worker.channel for worker in workers]
+    process = multiprocessing.get_context('fork').Process(
+        target=worker_main, args=(index, worker_channel, inherited_sockets),
+        name=f"http-worker-{index}", daemon=True)
+    process.start()
+    worker_channel.close()
+    return WorkerHandle(index, process, parent_channel)
 
-        content_length = 0
-        for line in header_lines:
-            if line.lower().startswith("content-length:"):
-                try:
-                    content_length = int(line.split(":", 1)[1].strip())
-                except (ValueError, IndexError):
-                    print(f"Invalid Content-Length from {address}")
-                    content_length = 0
-                break
+def replace_worker(selector, worker):
+    logger.warning(f"Worker {worker.index} (pid {worker.process.pid}) exited with code "
+                   f"{worker.process.exitcode}, restarting")
+    selector.unregister(worker.channel)
+    worker.channel.close()
+    worker.process.join(1)
+    workers.remove(worker)
+    new_worker = spawn_worker(worker.index)
+    workers.append(new_worker)
+    selector.register(new_worker.channel, selectors.EVENT_READ, new_worker)
+
+def dispatch_connection(connection, client_address):
+    # least-loaded: worker dengan koneksi aktif paling sedikit
+    for worker in sorted(workers, key=lambda w: w.active):
+        try:
+            socket.send_fds(worker.channel, [f"{client_address[0]} {client_address[1]}".encode()],
+                            [connection.fileno()])
+        except OSError:
+            continue
+        worker.active += 1
+        break
+    else:
+        logger.error(f"No worker available for {client_address}")
+    # salinan socket di parent harus ditutup, kalau tidak client tidak pernah menerima EOF
+    connection.close()
+
+def reuseport_worker_main(index):
+    global server_socket
+    # SIGTERM dari parent = berhenti accept, selesaikan koneksi aktif lalu keluar
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: shutdown_event.set())
 
-        while len(body) < content_length:
+    try:
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server_socket.bind(('0.0.0.0', PORT))
+        server_socket.listen(128)
+    except OSError as e:
+        logger.error(f"Worker {index}: cannot listen on port {PORT}: {e}")
+        os._exit(EXIT_BIND_FAILED)
+
+    http_server = HttpServer()
+    with ThreadPoolExecutor(worker_threads) as executor:
+        start_worker_metrics(executor)
+        while not shutdown_event.is_set():
             try:
-                remaining = content_length - len(body)
-                data = connection.recv(min(1024, remaining))
-                if not data:
+                server_socket.settimeout(1.0)
+                connection, client_address = server_socket.accept()
+                connection.settimeout(None)
+                executor.submit(queue_depth.track(process_client), http_server, connection, client_address, None)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if shutdown_event.is_set():
                     break
-                body += data
-            except socket.error as e:
-                print(f"Error reading body from {address}: {e}")
-                break
+                logger.error(f"Worker {index}: socket error: {e}")
+                time.sleep(0.1)
+        server_socket.close()
+    finish_worker()
 
-        response = http_server.process_request(headers_text, body)
-        
-        try:
-            connection.sendall(response)
-            print(f"Request processed successfully for {address}")
-            print()
-        except socket.error as e:
-            print(f"Error sending response to {address}: {e}")
-            print()
+def spawn_reuseport_worker(index):
+    process = multiprocessing.get_context('fork').Process(
+        target=reuseport_worker_main, args=(index,), name=f"http-worker-{index}", daemon=True)
+    process.start()
+    return WorkerHandle(index, process, None)
 
-    except Exception as e:
-        print(f"Error in process_client from {address}: {e}")
-    finally:
+def claim_reuseport_port():
+    """Fail like a plain bind when PORT is already served; returns the lock file to keep open"""
+    # worker SO_REUSEPORT akan ikut bergabung ke grup listen instance lama tanpa error,
+    # jadi parent memastikan dulu tidak ada instance lain: flock per port (instance reuseport
+    # lain) dan bind biasa tanpa SO_REUSEPORT (mode dispatch atau program lain)
+    lock_file = open(os.path.join(tempfile.gettempdir(), f"http-server-{PORT}.lock"), 'a+')
+    try:
         try:
-            connection.close()
-        except:
-            pass
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise OSError(errno.EADDRINUSE, f"Port {PORT} is locked by another instance")
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            probe.bind(('0.0.0.0', PORT))
+        finally:
+            probe.close()
+    except OSError:
+        lock_file.close()
+        raise
+    lock_file.truncate(0)
+    lock_file.write(f"{os.getpid()}\n")
+    lock_file.flush()
+    return lock_file
 
-def cleanup_completed_futures(clients):
-    completed = []
-    remaining = []
-    
-    for future in clients:
-        if future.done():
-            try:
-                future.result()
-            except Exception as e:
-                if logger:
-                    logger.error(f"Future completed with error: {e}")
-                else:
-                    print(f"Future completed with error: {e}")
-            completed.append(future)
-        else:
-            remaining.append(future)
-            
-    if completed and logger:
-        logger.debug(f"Cleaned up {len(completed)} completed futures")
-    elif completed:
-        print(f"Cleaned up {len(completed)} completed futures")
-    return remaining
-
-def get_server_stats(clients):
-    running_count = sum(1 for f in clients if f.running())
-    total_count = len(clients)
-    return {
-        'running': running_count,
-        'completed': total_count - running_count,
-        'total': total_count
-    }
-
-def start_server():
+def start_reuseport_server():
+    profiling_hook.install(forward_to=lambda: [worker.process.pid for worker in workers])
+    for index in range(worker_count):
+        workers.append(spawn_reuseport_worker(index))
+
+    logger.info(f"Server started on 0.0.0.0:{PORT} (SO_REUSEPORT)")
+    logger.info(f"Workers: {worker_count} processes x {worker_threads} threads, each with its own accept loop")
+    print()
+
+    restart_times = {}
+    while not shutdown_event.is_set():
+        multiprocessing.connection.wait([worker.process.sentinel for worker in workers], timeout=1.0)
+        for worker in list(workers):
+            if worker.process.is_alive() or shutdown_event.is_set():
+                continue
+            worker.process.join()
+            if worker.process.exitcode == EXIT_BIND_FAILED:
+                logger.error(f"Worker {worker.index} could not bind port {PORT}, shutting down")
+                shutdown_event.set()
+                break
+            logger.warning(f"Worker {worker.index} (pid {worker.process.pid}) exited with code "
+                           f"{worker.process.exitcode}, restarting")
+            # worker yang crash terus-menerus tidak di-restart dalam loop yang rapat
+            if time.time() - restart_times.get(worker.index, 0) < 1.0:
+                time.sleep(1.0)
+            restart_times[worker.index] = time.time()
+            workers.remove(worker)
+            workers.append(spawn_reuseport_worker(worker.index))
+
+    logger.info("Server shutting down...")
+    for worker in workers:
+        if worker.process.is_alive():
+            os.kill(worker.process.pid, signal.SIGTERM)
+    deadline = time.time() + 30
+    for worker in workers:
+        worker.process.join(max(0, deadline - time.time()))
+        if worker.process.is_alive():
+            logger.warning(f"Worker {worker.index} did not stop in time, terminating")
+            worker.process.kill()
+            worker.process.join()
+
+def start_server(mode='dispatch'):
     global server_socket, logger
     logger = setup_logging()
-    
+
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
-    clients = []
-    
+    metrics.enable_sharing(tempfile.mkdtemp(prefix='http-metrics-'))
+
+    if mode == 'reuseport':
+        try:
+            port_lock = claim_reuseport_port()
+        except OSError as e:
+            shutil.rmtree(metrics.share_dir, ignore_errors=True)
+            if e.errno == errno.EADDRINUSE:
+                logger.error(f"Port {PORT} is already in use")
+            else:
+                logger.error(f"Socket error: {e}")
+            return
+        try:
+            start_reuseport_server()
+        except KeyboardInterrupt:
+            logger.info("Server interrupted by user")
+        finally:
+            shutil.rmtree(metrics.share_dir, ignore_errors=True)
+            port_lock.close()
+            logger.info("Server stopped")
+        return
+
     try:
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind(('0.0.0.0', 8889))
+        server_socket.bind(('0.0.0.0', PORT))
         server_socket.listen(128)
-        
-        logger.info("Server started on 0.0.0.0:8889")
-        logger.info("Max workers: 20")
+        server_socket.setblocking(False)
+
+        profiling_hook.install(forward_to=lambda: [worker.process.pid for worker in workers])
+        for index in range(worker_count):
+            workers.append(spawn_worker(index))
+
+        logger.info(f"Server started on 0.0.0.0:{PORT}")
+        logger.info(f"Workers: {worker_count} processes x {worker_threads} threads")
         print()
 
-        with ProcessPoolExecutor(20, initializer=lambda: signal.signal(signal.SIGINT, signal.SIG_IGN)) as executor:
-            while not shutdown_event.is_set():
-                try:
-                    server_socket.settimeout(1.0)
-                    connection, client_address = server_socket.accept()
-                    
-                    future = executor.submit(process_client, (connection, client_address))
-                    clients.append(future)
-                    
-                    if len(clients) % 10 == 0:
-                        clients = cleanup_completed_futures(clients)
-                    
-                except socket.timeout:
-                    continue
-                except socket.error as e:
-                    if shutdown_event.is_set():
-                        break
-                    logger.error(f"Socket error: {e}")
-                    time.sleep(0.1)
-                except Exception as e:
-                    logger.error(f"Unexpected error in server loop: {e}")
-                    time.sleep(0.1)
-            
-            logger.info("Server shutting down...")
-            
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ, None)
+        for worker in workers:
+            selector.register(worker.channel, selectors.EVENT_READ, worker)
+
+        while not shutdown_event.is_set():
             try:
-                active_futures = [f for f in clients if not f.done()]
-                if active_futures:
-                    logger.info(f"Waiting for {len(active_futures)} active connections...")
-                    for future in as_completed(active_futures, timeout=5):
+                for key, _ in selector.select(timeout=1.0):
+                    if key.data is None:
                         try:
-                            future.result()
-                        except Exception as e:
-                            logger.error(f"Task completed with error: {e}")
-                else:
-                    logger.info("No active connections to wait for")
+                            connection, client_address = server_socket.accept()
+                        except BlockingIOError:
+                            continue
+                        dispatch_connection(connection, client_address)
+                        continue
+
+                    worker = key.data
+                    try:
+                        message = worker.channel.recv(64)
+                    except OSError:
+                        message = b""
+                    if message:
+                        worker.active -= message.count(CONNECTION_DONE)
+                    else:
+                        worker.process.join(1)
+                        replace_worker(selector, worker)
+
+                for worker in list(workers):
+                    if not worker.process.is_alive():
+                        replace_worker(selector, worker)
             except Exception as e:
-                logger.warning(f"Timeout waiting for connections to complete: {e}")
-                
+                if shutdown_event.is_set():
+                    break
+                logger.error(f"Unexpected error in server loop: {e}")
+                time.sleep(0.1)
+
+        logger.info("Server shutting down...")
+        selector.close()
+        server_socket.close()
+        # channel yang ditutup adalah sinyal shutdown untuk worker
+        for worker in workers:
+            worker.channel.close()
+        active = sum(worker.active for worker in workers)
+        if active:
+            logger.info(f"Waiting for {active} active connections...")
+        deadline = time.time() + 30
+        for worker in workers:
+            worker.process.join(max(0, deadline - time.time()))
+            if worker.process.is_alive():
+                logger.warning(f"Worker {worker.index} did not stop in time, terminating")
+                worker.process.kill()
+                worker.process.join()
+
     except OSError as e:
         if e.errno == 98:
-            logger.error("Port 8889 is already in use")
+            logger.error(f"Port {PORT} is already in use")
         else:
             logger.error(f"Socket error: {e}")
     except KeyboardInterrupt:
@@ -210,10 +394,44 @@ def start_server():
     finally:
         if server_socket:
             server_socket.close()
+        shutil.rmtree(metrics.share_dir, ignore_errors=True)
         logger.info("Server stopped")
 
 def main():
-    start_server()
+    global keep_alive_timeout, keep_alive_max, header_timeout, worker_count, worker_threads
+    cmd_parser = argparse.ArgumentParser(description='HTTP Server')
+    cmd_parser.add_argument('--mode', choices=['dispatch', 'reuseport'], default='dispatch',
+                            help='dispatch = parent accepts and passes sockets to the least-loaded worker, '
+                                 'reuseport = prefork workers with their own SO_REUSEPORT accept loops '
+                                 '(default: dispatch)')
+    cmd_parser.add_argument('--workers', type=int, default=worker_count,
+                            help=f'Number of worker processes (default: {worker_count})')
+    cmd_parser.add_argument('--threads', type=int, default=worker_threads,
+                            help=f'Connection threads per worker process (default: {worker_threads})')
+    cmd_parser.add_argument('--profile-dir', default='profiles',
+                            help='Output directory for SIGUSR1/SIGUSR2 captures (default: ./profiles)')
+    cmd_parser.add_argument('--profile-seconds', type=float, default=30, help='Stop a capture after N seconds (default: 30)')
+    cmd_parser.add_argument('--profile-requests', type=int, default=None, help='Stop a capture after N requests')
+    cmd_parser.add_argument('--keep-alive-timeout', type=float, default=KEEP_ALIVE_TIMEOUT,
+                            help=f'Close idle keep-alive connections after N seconds (default: {KEEP_ALIVE_TIMEOUT})')
+    cmd_parser.add_argument('--keep-alive-max', type=int, default=KEEP_ALIVE_MAX_REQUESTS,
+                            help=f'Maximum requests per connection (default: {KEEP_ALIVE_MAX_REQUESTS})')
+    cmd_parser.add_argument('--header-timeout', type=float, default=HEADER_TIMEOUT,
+                            help=f'Close connections whose request head is not complete N seconds after its '
+                                 f'first byte (default: {HEADER_TIMEOUT})')
+    access_logger.add_arguments(cmd_parser)
+    cmd_args = cmd_parser.parse_args()
+    access_logger.configure_from_args(cmd_args)
+
+    profiling_hook.output_dir = cmd_args.profile_dir
+    profiling_hook.duration = cmd_args.profile_seconds
+    profiling_hook.max_requests = cmd_args.profile_requests
+    keep_alive_timeout = cmd_args.keep_alive_timeout
+    keep_alive_max = cmd_args.keep_alive_max
+    header_timeout = cmd_args.header_timeout
+    worker_count = cmd_args.workers
+    worker_threads = cmd_args.threads
+    start_server(cmd_args.mode)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
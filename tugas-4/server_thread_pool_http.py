@@ -1,15 +1,116 @@
+import math
+import queue
 import socket
 import time
 import logging
 import signal
+import selectors
 import threading
+import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from http import HttpServer
+from http import HttpServer, MAX_HEADER_SIZE
+from http_connection import (serve_requests, reject_header_timeout, KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_REQUESTS,
+                             REQUEST_TIMEOUT, HEADER_TIMEOUT, RECV_SIZE)
+from profiling_hook import ProfilingHook
+from http_metrics import registry as metrics, QueueDepth
+from access_log import access_logger
+
+"""
+* front stage (thread utama) memegang semua socket yang sedang membaca header request
+atau idle di antara request keep-alive, dengan satu selector: client yang lambat atau
+idle tidak memakan thread pool
+
+* koneksi baru diserahkan ke thread pool hanya setelah satu request head lengkap
+ada di buffer, worker melayani request itu (dan request pipelined berikutnya yang
+sudah lengkap) lalu mengembalikan koneksi ke front stage lewat returned_clients
+
+* deadline dijaga dengan timer wheel: header harus lengkap dalam header_timeout sejak
+byte pertamanya (proteksi slowloris), koneksi idle ditutup setelah keep_alive_timeout
+"""
+
+# worker menunggu sebentar request keep-alive berikutnya sebelum mengembalikan koneksi,
+# menghemat dua perpindahan thread untuk client yang langsung mengirim request lagi
+KEEP_ALIVE_LINGER = 0.002
+TIMER_TICK = 0.1
+TIMER_SLOTS = 1024
+PORT = 8885
+MAX_THREADS = 50
 
 http_server = HttpServer()
 shutdown_event = threading.Event()
 server_socket = None
 logger = None
+keep_alive_timeout = KEEP_ALIVE_TIMEOUT
+keep_alive_max = KEEP_ALIVE_MAX_REQUESTS
+header_timeout = HEADER_TIMEOUT
+profiling_hook = ProfilingHook('server_thread_pool_http')
+
+# request dengan head lengkap yang sudah di-submit tetapi belum mendapat thread
+queue_depth = QueueDepth()
+
+# koneksi keep-alive yang dikembalikan worker ke front stage
+returned_clients = queue.SimpleQueue()
+wakeup_reader, wakeup_writer = socket.socketpair()
+wakeup_reader.setblocking(False)
+wakeup_writer.setblocking(False)
+
+
+class ClientState:
+    """Koneksi client dan byte yang sudah dibaca, dimiliki front stage atau tepat satu worker"""
+
+    __slots__ = ('connection', 'address', 'buffer', 'handled', 'header_started', 'released')
+
+    def __init__(self, connection, address):
+        self.connection = connection
+        self.address = address
+        self.buffer = b""
+        self.handled = 0
+        # time.monotonic() saat byte pertama request head di buffer tiba
+        self.header_started = None
+        self.released = False
+
+
+class TimerWheel:
+    """Hashed timer wheel: schedule/cancel O(1), expire() only visits the slots of elapsed ticks"""
+
+    def __init__(self, tick=TIMER_TICK, slots=TIMER_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = self.now_tick()
+        # key -> tick deadline, entry di slot dengan tick lain sudah dibatalkan/dijadwalkan ulang
+        self.deadlines = {}
+
+    def now_tick(self):
+        return int(time.monotonic() / self.tick)
+
+    def schedule(self, key, timeout):
+        expiry = self.now_tick() + max(1, math.ceil(timeout / self.tick))
+        self.deadlines[key] = expiry
+        self.slots[expiry % len(self.slots)].append((key, expiry))
+
+    def cancel(self, key):
+        self.deadlines.pop(key, None)
+
+    def expire(self):
+        """Keys whose deadline has passed"""
+        now = self.now_tick()
+        expired = []
+        for step in range(1, min(now - self.current, len(self.slots)) + 1):
+            index = (self.current + step) % len(self.slots)
+            remaining = []
+            for key, expiry in self.slots[index]:
+                if self.deadlines.get(key) != expiry:
+                    continue
+                if expiry <= now:
+                    del self.deadlines[key]
+                    expired.append(key)
+                else:
+                    # deadline lebih dari satu putaran wheel lagi
+                    remaining.append((key, expiry))
+            self.slots[index] = remaining
+        self.current = max(self.current, now)
+        return expired
+
 
 def setup_logging():
     logging.basicConfig(
@@ -18,91 +119,112 @@ def setup_logging():
     )
     return logging.getLogger(__name__)
 
+def wake_front_stage():
+    try:
+        wakeup_writer.send(b"\0")
+    except (BlockingIOError, OSError):
+        # buffer penuh berarti front stage memang sudah akan bangun
+        pass
+
 def signal_handler(signum, frame):
     if logger:
         logger.info(f"Received signal {signum}, shutting down gracefully...")
     else:
         print(f"Received signal {signum}, shutting down gracefully...")
     shutdown_event.set()
-    if server_socket:
-        server_socket.close()
+    wake_front_stage()
 
-def process_client(connection, address):
+def release_client(state, buffer, handled, header_started):
+    # dipanggil worker saat koneksi menunggu request head berikutnya
+    state.buffer = buffer
+    state.handled = handled
+    state.header_started = header_started
+    state.released = True
+
+def process_client(state):
+    state.released = False
     try:
-        connection.settimeout(30.0)
-        
-        header_data = b""
-        start_time = time.time()
-        
-        while b"\r\n\r\n" not in header_data:
-            if time.time() - start_time > 30:
-                print(f"Request timeout from {address}")
-                return
-                
-            try:
-                data = connection.recv(1024)
-                if not data:
-                    break
-                header_data += data
-            except socket.timeout:
-                print(f"Socket timeout from {address}")
-                return
-            except socket.error as e:
-                print(f"Socket error from {address}: {e}")
-                return
-
-        if b"\r\n\r\n" not in header_data:
-            print(f"Incomplete request from {address}")
-            return
+        serve_requests(http_server, state.connection, state.address, keep_alive_timeout, keep_alive_max,
+                       REQUEST_TIMEOUT, profiling_hook, shutdown_event, state.buffer, state.handled,
+                       release=lambda buffer, handled, started: release_client(state, buffer, handled, started),
+                       linger=KEEP_ALIVE_LINGER, header_timeout=header_timeout,
+                       header_started=state.header_started)
+    except Exception as e:
+        access_logger.error('connection failed', client=state.address, error=str(e))
+        state.released = False
+    if state.released:
+        returned_clients.put(state)
+        wake_front_stage()
+    else:
+        close_client(state)
 
-        header_end_pos = header_data.find(b"\r\n\r\n") + 4
-        header_bytes_only = header_data[:header_end_pos]
-        body = header_data[header_end_pos:]
-        
+def close_client(state):
+    try:
+        state.connection.close()
+    except OSError:
+        pass
+    metrics.connection_closed()
+    access_logger.debug('connection closed', client=state.address)
+
+def watch_client(selector, timer_wheel, state):
+    """Front stage takes the connection until its next request head is complete"""
+    state.connection.setblocking(False)
+    selector.register(state.connection, selectors.EVENT_READ, state)
+    if state.buffer:
+        # head yang sudah mulai di worker tetap memakai deadline dari byte pertamanya
+        timer_wheel.schedule(state, state.header_started + header_timeout - time.monotonic())
+    else:
+        timer_wheel.schedule(state, keep_alive_timeout if state.handled else header_timeout)
+
+def unwatch_client(selector, timer_wheel, state):
+    selector.unregister(state.connection)
+    timer_wheel.cancel(state)
+
+def accept_clients(selector, timer_wheel):
+    while True:
         try:
-            headers_text = header_bytes_only.decode('utf-8')
-        except UnicodeDecodeError:
-            print(f"Invalid UTF-8 in headers from {address}")
+            connection, client_address = server_socket.accept()
+        except (BlockingIOError, InterruptedError):
             return
-            
-        headers_lines = headers_text.split("\r\n")
-        
-        content_length = 0
-        for line in headers_lines:
-            if line.lower().startswith("content-length:"):
-                try:
-                    content_length = int(line.split(":", 1)[1].strip())
-                except (ValueError, IndexError):
-                    print(f"Invalid Content-Length from {address}")
-                    content_length = 0
-                break
+        metrics.connection_opened()
+        access_logger.debug('connection opened', client=client_address)
+        watch_client(selector, timer_wheel, ClientState(connection, client_address))
 
-        while len(body) < content_length:
-            try:
-                remaining = content_length - len(body)
-                data = connection.recv(min(1024, remaining))
-                if not data:
-                    break
-                body += data
-            except socket.error as e:
-                print(f"Error reading body from {address}: {e}")
-                break
+def read_client(selector, timer_wheel, state):
+    """Buffer bytes of the next request head, True once it is complete (or too large) for a worker"""
+    try:
+        data = state.connection.recv(RECV_SIZE)
+    except (BlockingIOError, InterruptedError):
+        return False
+    except OSError as e:
+        access_logger.error('socket error', client=state.address, error=str(e))
+        data = b""
+    if not data:
+        if state.buffer:
+            access_logger.error('incomplete request', client=state.address)
+        unwatch_client(selector, timer_wheel, state)
+        close_client(state)
+        return False
 
-        response = http_server.process_request(headers_text, body)
-        
-        try:
-            connection.sendall(response)
-            print(f"Request processed successfully for {address}")
-        except socket.error as e:
-            print(f"Error sending response to {address}: {e}")
-            
-    except Exception as e:
-        print(f"Error in process_client from {address}: {e}")
-    finally:
-        try:
-            connection.close()
-        except:
-            pass
+    idle = not state.buffer
+    scanned = max(0, len(state.buffer) - 3)
+    state.buffer += data
+    if state.buffer.find(b"\r\n\r\n", scanned) >= 0 or len(state.buffer) > MAX_HEADER_SIZE:
+        unwatch_client(selector, timer_wheel, state)
+        # worker membaca body dan menulis response secara blocking
+        state.connection.settimeout(REQUEST_TIMEOUT)
+        return True
+    if idle:
+        # request baru dimulai: deadline header dihitung dari byte pertamanya, tidak diperpanjang per recv
+        state.header_started = time.monotonic()
+        timer_wheel.schedule(state, header_timeout)
+    return False
+
+def expire_client(selector, state):
+    selector.unregister(state.connection)
+    if state.buffer:
+        reject_header_timeout(http_server, state.connection, state.address, len(state.buffer))
+    close_client(state)
 
 def cleanup_completed_futures(clients):
     completed = []
@@ -113,18 +235,13 @@ def cleanup_completed_futures(clients):
             try:
                 future.result()
             except Exception as e:
-                if logger:
-                    logger.error(f"Thread completed with error: {e}")
-                else:
-                    print(f"Thread completed with error: {e}")
+                access_logger.error('thread failed', error=str(e))
             completed.append(future)
         else:
             remaining.append(future)
     
-    if completed and logger:
-        logger.debug(f"Cleaned up {len(completed)} completed futures")
-    elif completed:
-        print(f"Cleaned up {len(completed)} completed futures")
+    if completed:
+        access_logger.debug('futures cleaned up', completed=len(completed))
     return remaining
 
 def get_server_stats(clients):
@@ -142,43 +259,70 @@ def start_server():
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    profiling_hook.install()
     
     clients = []
+    selector = selectors.DefaultSelector()
+    timer_wheel = TimerWheel()
     
     try:
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)	
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        server_socket.bind(('0.0.0.0', 8885))
+        server_socket.bind(('0.0.0.0', PORT))
         server_socket.listen(128)
+        server_socket.setblocking(False)
+        selector.register(server_socket, selectors.EVENT_READ, None)
+        selector.register(wakeup_reader, selectors.EVENT_READ, wakeup_reader)
         
-        print("ThreadPool HTTP Server started on 0.0.0.0:8885")
-        print("Max threads: 50")
+        print(f"ThreadPool HTTP Server started on 0.0.0.0:{PORT}")
+        print(f"Max threads: {MAX_THREADS}, header timeout: {header_timeout}s, idle timeout: {keep_alive_timeout}s")
 
-        with ThreadPoolExecutor(50) as executor:
+        with ThreadPoolExecutor(MAX_THREADS) as executor:
+            # request dengan head lengkap yang belum mendapat thread
+            metrics.add_gauge('executor_queue_depth', 'Complete request heads waiting for a pool thread',
+                              queue_depth.value)
+            metrics.add_gauge('executor_running', 'Pool threads currently serving a connection',
+                              lambda: get_server_stats(clients)['running'])
+            metrics.add_gauge('front_stage_connections', 'Connections reading a request head or idle',
+                              lambda: len(timer_wheel.deadlines))
             while not shutdown_event.is_set():
                 try:
-                    server_socket.settimeout(1.0)
-                    connection, client_address = server_socket.accept()
-                    
-                    print()
-                    future = executor.submit(process_client, connection, client_address)
-                    clients.append(future)
-                    
-                    if len(clients) % 20 == 0:
-                        clients = cleanup_completed_futures(clients)
-                    
-                except socket.timeout:
-                    continue
-                except socket.error as e:
+                    timeout = TIMER_TICK if timer_wheel.deadlines else 1.0
+                    for key, _ in selector.select(timeout):
+                        if key.data is None:
+                            accept_clients(selector, timer_wheel)
+                        elif key.data is wakeup_reader:
+                            try:
+                                wakeup_reader.recv(4096)
+                            except BlockingIOError:
+                                pass
+                        elif read_client(selector, timer_wheel, key.data):
+                            clients.append(executor.submit(queue_depth.track(process_client), key.data))
+                            if len(clients) % 20 == 0:
+                                clients = cleanup_completed_futures(clients)
+
+                    while True:
+                        try:
+                            state = returned_clients.get_nowait()
+                        except queue.Empty:
+                            break
+                        watch_client(selector, timer_wheel, state)
+
+                    for state in timer_wheel.expire():
+                        expire_client(selector, state)
+
+                except Exception as e:
                     if shutdown_event.is_set():
                         break
-                    logger.error(f"Socket error: {e}")
-                    time.sleep(0.1)
-                except Exception as e:
                     logger.error(f"Unexpected error in server loop: {e}")
                     time.sleep(0.1)
             
             logger.info("Server shutting down...")
+            # koneksi idle atau yang masih membaca header langsung ditutup
+            for key in list(selector.get_map().values()):
+                if isinstance(key.data, ClientState):
+                    unwatch_client(selector, timer_wheel, key.data)
+                    close_client(key.data)
             logger.info("Waiting for active connections to complete...")
             
             try:
@@ -194,10 +338,17 @@ def start_server():
                     logger.info("No active connections to wait for")
             except Exception as e:
                 logger.warning(f"Timeout waiting for connections to complete: {e}")
+
+            # dikembalikan worker tepat sebelum shutdown
+            while True:
+                try:
+                    close_client(returned_clients.get_nowait())
+                except queue.Empty:
+                    break
                 
     except OSError as e:
         if e.errno == 98:
-            logger.error("Error: Port 8885 is already in use")
+            logger.error(f"Error: Port {PORT} is already in use")
         else:
             logger.error(f"Socket error: {e}")
     except KeyboardInterrupt:
@@ -205,11 +356,35 @@ def start_server():
     except Exception as e:
         logger.error(f"Unexpected server error: {e}")
     finally:
+        selector.close()
         if server_socket:
             server_socket.close()
         logger.info("Server stopped")
 
 def main():
+    global keep_alive_timeout, keep_alive_max, header_timeout
+    cmd_parser = argparse.ArgumentParser(description='HTTP Server')
+    cmd_parser.add_argument('--profile-dir', default='profiles',
+                            help='Output directory for SIGUSR1/SIGUSR2 captures (default: ./profiles)')
+    cmd_parser.add_argument('--profile-seconds', type=float, default=30, help='Stop a capture after N seconds (default: 30)')
+    cmd_parser.add_argument('--profile-requests', type=int, default=None, help='Stop a capture after N requests')
+    cmd_parser.add_argument('--keep-alive-timeout', type=float, default=KEEP_ALIVE_TIMEOUT,
+                            help=f'Close idle keep-alive connections after N seconds (default: {KEEP_ALIVE_TIMEOUT})')
+    cmd_parser.add_argument('--keep-alive-max', type=int, default=KEEP_ALIVE_MAX_REQUESTS,
+                            help=f'Maximum requests per connection (default: {KEEP_ALIVE_MAX_REQUESTS})')
+    cmd_parser.add_argument('--header-timeout', type=float, default=HEADER_TIMEOUT,
+                            help=f'Close connections whose request head is not complete N seconds after its '
+                                 f'first byte (default: {HEADER_TIMEOUT})')
+    access_logger.add_arguments(cmd_parser)
+    cmd_args = cmd_parser.parse_args()
+    access_logger.configure_from_args(cmd_args)
+
+    profiling_hook.output_dir = cmd_args.profile_dir
+    profiling_hook.duration = cmd_args.profile_seconds
+    profiling_hook.max_requests = cmd_args.profile_requests
+    keep_alive_timeout = cmd_args.keep_alive_timeout
+    keep_alive_max = cmd_args.keep_alive_max
+    header_timeout = cmd_args.header_timeout
     start_server()
 
 if __name__ == "__main__":
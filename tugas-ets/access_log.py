@@ -0,0 +1,12 @@
+import os
+import sys
+
+"""
+* implementasi access log ada di common/access_log.py (dipakai bersama tugas-2,
+tugas-4 dan tugas-ets), modul ini hanya meneruskan import supaya
+`from access_log import access_logger` tetap berlaku di direktori ini
+"""
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.access_log import *  # noqa: E402,F401,F403
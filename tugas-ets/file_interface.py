@@ -1,7 +1,27 @@
 import os
 import json
+import fcntl
 import base64
+import tempfile
 from glob import glob
+from contextlib import contextmanager
+
+"""
+* upload ditulis ke file sementara (nama unik, diawali titik sehingga tidak ikut di LIST)
+lalu dipublikasikan dengan os.replace: GET yang sedang berjalan tetap membaca versi
+lama lewat fd miliknya, GET berikutnya langsung mendapat versi baru yang lengkap,
+dan dua upload bersamaan tidak pernah saling menimpa isi file
+
+* versi file (data_versi pada GET/UPLOAD) adalah ukuran dan mtime dalam hex;
+UPLOAD <nama> <isi> <versi> hanya berhasil jika file masih pada versi tersebut
+(versi '-' berarti file belum boleh ada), sehingga update yang bersamaan tidak hilang
+"""
+
+UPLOAD_TEMP_PREFIX = '.upload-'
+VERSION_ABSENT = '-'
+
+def file_version(file_stat):
+    return f"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}"
 
 class FileInterface:
     def __init__(self):
@@ -16,14 +36,17 @@ class FileInterface:
         except Exception as e:
             return dict(status='ERROR', data=str(e))
 
-    def get(self, params=[]):
+    def get(self, params=[], as_bytes=False):
         try:
             filename = params[0]
             if not filename:
                 return None
             with open(filename, 'rb') as fp:
-                isifile = base64.b64encode(fp.read()).decode()
-            return dict(status='OK', data_namafile=filename, data_file=isifile)
+                versi = file_version(os.fstat(fp.fileno()))
+                isifile = base64.b64encode(fp.read())
+            if not as_bytes:
+                isifile = isifile.decode()
+            return dict(status='OK', data_namafile=filename, data_file=isifile, data_versi=versi)
         except Exception as e:
             return dict(status='ERROR', data=str(e))
 
@@ -38,15 +61,38 @@ class FileInterface:
             if not filename:
                 return dict(status='ERROR', data='Nama file kosong')
             
+            expected_version = params[2] if len(params) > 2 else None
+            
             file_content = base64.b64decode(file_content_b64)
             
-            with open(filename, 'wb') as fp:
-                fp.write(file_content)
+            temp_fd, temp_path = tempfile.mkstemp(prefix=UPLOAD_TEMP_PREFIX, dir='.')
+            try:
+                os.fchmod(temp_fd, 0o644)
+                with os.fdopen(temp_fd, 'wb') as fp:
+                    fp.write(file_content)
+                versi = file_version(os.stat(temp_path))
+                with publish_lock():
+                    current_version = self.current_version(filename)
+                    if expected_version is not None and expected_version != current_version:
+                        os.remove(temp_path)
+                        return dict(status='ERROR', data=f'Versi file {filename} sudah berubah',
+                                    data_versi=current_version)
+                    os.replace(temp_path, filename)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
                 
-            return dict(status='OK', data=f'File {filename} berhasil diupload')
+            return dict(status='OK', data=f'File {filename} berhasil diupload', data_versi=versi)
             
         except Exception as e:
             return dict(status='ERROR', data=str(e))
+
+    def current_version(self, filename):
+        try:
+            return file_version(os.stat(filename))
+        except FileNotFoundError:
+            return VERSION_ABSENT
             
     def delete(self, params=[]):
         try:
@@ -67,6 +113,17 @@ class FileInterface:
             
         except Exception as e:
             return dict(status='ERROR', data=str(e))
+
+@contextmanager
+def publish_lock():
+    """Exclusive flock on the current directory, held while checking the version and renaming"""
+    # setiap open punya lock sendiri, jadi thread dalam satu proses juga saling tunggu
+    dir_fd = os.open('.', os.O_RDONLY)
+    try:
+        fcntl.flock(dir_fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(dir_fd)
         
 if __name__=='__main__':
     f = FileInterface()
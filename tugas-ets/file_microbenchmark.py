@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import base64
+import argparse
+import tempfile
+import contextlib
+from access_log import access_logger
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.microbenchmark import format_size, measure, compare_with_baseline  # noqa: E402
+
+"""
+* microbenchmark in-process (tanpa socket) untuk hot path FileProtocol dan FileInterface
+
+* setiap case di-warmup, lalu diukur berulang kali (ns/op = median dari beberapa repeat),
+alokasi per operasi diukur terpisah dengan tracemalloc (peak bytes selama satu operasi),
+lihat common/microbenchmark.py
+
+* hasil bisa disimpan sebagai baseline JSON (--save-baseline) dan dibandingkan
+pada run berikutnya (--compare), exit code 1 jika ada regresi di atas --threshold
+"""
+
+
+def bench_filename(prefix, size):
+    # proses_string me-lowercase seluruh request, nama file di disk harus lowercase
+    return f"{prefix}_{format_size(size)}.bin".lower()
+
+
+def build_cases(payload_sizes, file_sizes):
+    # FileInterface pindah ke direktori files/, jadi import dilakukan setelah chdir ke direktori kerja
+    from file_protocol import FileProtocol
+
+    protocol = FileProtocol()
+    file_interface = protocol.file
+    cases = []
+
+    for size in sorted(set(payload_sizes) | set(file_sizes)):
+        with open(bench_filename('bench', size), 'wb') as fp:
+            fp.write(os.urandom(size))
+
+    cases.append(('proses_string LIST', lambda: protocol.proses_string("LIST"), None))
+    cases.append(('proses_string unknown', lambda: protocol.proses_string("HELLO world"), None))
+
+    for size in payload_sizes:
+        name = format_size(size)
+        payload = base64.b64encode(os.urandom(size)).decode()
+        get_command = f"GET {bench_filename('bench', size)}"
+        upload_command = f"UPLOAD {bench_filename('upload', size)} {payload}"
+        delete_command = f"DELETE {bench_filename('delete', size)}"
+        cases.append((f"proses_string GET {name}", lambda c=get_command: protocol.proses_string(c), None))
+        cases.append((f"proses_string UPLOAD {name}", lambda c=upload_command: protocol.proses_string(c), None))
+
+        def recreate(filename=bench_filename('delete', size), size=size):
+            with open(filename, 'wb') as fp:
+                fp.write(b'x' * size)
+        cases.append((f"proses_string DELETE {name}", lambda c=delete_command: protocol.proses_string(c), recreate))
+
+    for size in file_sizes:
+        name = format_size(size)
+        payload = base64.b64encode(os.urandom(size)).decode()
+        get_params = [bench_filename('bench', size)]
+        upload_params = [bench_filename('upload', size), payload]
+        cases.append((f"FileInterface.get {name}", lambda p=get_params: file_interface.get(p), None))
+        cases.append((f"FileInterface.upload {name}", lambda p=upload_params: file_interface.upload(p), None))
+
+    return cases
+
+
+def main():
+    cmd_parser = argparse.ArgumentParser(description='FileProtocol/FileInterface microbenchmark')
+    cmd_parser.add_argument('--payload-sizes', type=int, nargs='+', default=[1024, 64 * 1024, 1024 * 1024],
+                            help='proses_string payload sizes in bytes (default: 1KB 64KB 1MB)')
+    cmd_parser.add_argument('--file-sizes', type=int, nargs='+',
+                            default=[1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024],
+                            help='FileInterface.get/upload sizes in bytes (default: 1KB 1MB 10MB 100MB)')
+    cmd_parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per repeat (default: 0.2)')
+    cmd_parser.add_argument('--repeat', type=int, default=5, help='Number of timed repeats (default: 5)')
+    cmd_parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this text')
+    cmd_parser.add_argument('--save-baseline', metavar='FILE', help='Save results as a JSON baseline')
+    cmd_parser.add_argument('--compare', metavar='FILE', help='Compare results against a JSON baseline')
+    cmd_parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold in percent (default: 10)')
+    args = cmd_parser.parse_args()
+
+    baseline_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    # FileProtocol menulis access log untuk setiap request, jangan sampai memenuhi terminal
+    access_logger.configure('off')
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        for name, operation, setup in build_cases(args.payload_sizes, args.file_sizes):
+            if args.filter not in name:
+                continue
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results[name] = measure(operation, setup, args.min_time, args.repeat)
+            print(f"{name:40} {results[name]['ns_per_op']:14.0f} ns/op {results[name]['bytes_per_op']:12d} B/op",
+                  file=sys.stderr)
+        os.chdir('/')
+
+    regressions = []
+    if compare_path:
+        with open(compare_path) as fp:
+            regressions = compare_with_baseline(results, json.load(fp), args.threshold)
+
+    if baseline_path:
+        with open(baseline_path, 'w') as fp:
+            json.dump(results, fp, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,9 @@
 import json
-import logging
+import time
 import shlex
 
 from file_interface import FileInterface
+from access_log import access_logger
 
 """
 * class FileProtocol bertugas untuk memproses 
@@ -14,24 +15,56 @@ pada akhirnya akan diproses dalam bentuk string
 
 * class FileProtocol akan memproses data yang masuk dalam bentuk
 string
+
+* setiap request dicatat ke access log (satu baris: command, status, ukuran, durasi),
+isi request hanya dicatat pada --log-level debug dan dipotong (lihat access_log)
+
+* proses_buffers menghasilkan response sebagai daftar buffer: isi file GET (base64)
+tetap berupa bytes dan disisipkan ke JSON tanpa decode/dumps/encode ulang, server
+mengirimnya bersama RESPONSE_TERMINATOR dengan socket_buffers.send_buffers (sendmsg)
 """
 
+RESPONSE_TERMINATOR = b"\r\n\r\n"
+
+
+def result_buffers(result):
+    """JSON of a FileInterface result as buffers, a bytes data_file is spliced in as-is"""
+    data_file = result.get('data_file') if isinstance(result, dict) else None
+    if not isinstance(data_file, bytes):
+        return [json.dumps(result).encode()]
+    rest = {key: value for key, value in result.items() if key != 'data_file'}
+    # base64 tidak mengandung karakter yang perlu di-escape JSON
+    head = json.dumps(rest)[:-1]
+    return [f'{head}, "data_file": "'.encode(), memoryview(data_file), b'"}']
 
 
 class FileProtocol:
     def __init__(self):
         self.file = FileInterface()
-    def proses_string(self,string_datamasuk=''):
-        logging.warning(f"string diproses: {string_datamasuk}")
+    def proses_string(self,string_datamasuk='',client=None):
+        return b"".join(self.proses_buffers(string_datamasuk, client)).decode()
+    def proses_buffers(self,string_datamasuk='',client=None):
+        started = time.perf_counter()
+        access_logger.debug('request received', client=client, payload=string_datamasuk)
         c = shlex.split(string_datamasuk.lower())
+        c_request = None
         try:
             c_request = c[0].strip()
-            logging.warning(f"memproses request: {c_request}")
             params = [x for x in c[1:]]
-            cl = getattr(self.file,c_request)(params)
-            return json.dumps(cl)
+            if c_request == 'get':
+                # isi file tetap bytes base64, lihat result_buffers
+                cl = self.file.get(params, as_bytes=True)
+            else:
+                cl = getattr(self.file,c_request)(params)
+            hasil = result_buffers(cl)
+            status = cl.get('status') if isinstance(cl, dict) else None
         except Exception:
-            return json.dumps(dict(status='ERROR',data='request tidak dikenali'))
+            hasil = result_buffers(dict(status='ERROR',data='request tidak dikenali'))
+            status = 'ERROR'
+        access_logger.request(client=client, command=c_request, status=status, received=len(string_datamasuk),
+                              sent=sum(len(buffer) for buffer in hasil),
+                              duration_ms=round((time.perf_counter() - started) * 1000, 3))
+        return hasil
 
 
 if __name__=='__main__':
@@ -2,11 +2,16 @@ from socket import *
 import socket
 import threading
 import logging
-import time
 import sys
+import os
+import argparse
 
-from file_protocol import FileProtocol
+from file_protocol import FileProtocol, RESPONSE_TERMINATOR
+from socket_buffers import send_buffers
+from profiling_hook import ProfilingHook
+from access_log import access_logger
 fp = FileProtocol()
+profiling_hook = ProfilingHook('file_server', output_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
 
 logging.basicConfig(
     format='[%(asctime)s] %(message)s',
@@ -25,12 +30,11 @@ class ProcessTheClient(threading.Thread):
             data = self.connection.recv(4096)
             if data:
                 d = data.decode()
-                now = time.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"[{now}] Received from {self.address}: {d}")
-
-                hasil = fp.proses_string(d)
-                hasil = hasil + "\r\n\r\n"
-                self.connection.sendall(hasil.encode())
+                if profiling_hook.active:
+                    hasil = profiling_hook.run(fp.proses_buffers, d, self.address)
+                else:
+                    hasil = fp.proses_buffers(d, self.address)
+                send_buffers(self.connection, hasil + [RESPONSE_TERMINATOR])
             else:
                 break
         self.connection.close()
@@ -50,7 +54,7 @@ class Server(threading.Thread):
         self.my_socket.listen(1)
         while True:
             self.connection, self.client_address = self.my_socket.accept()
-            logging.warning(f"connection from {self.client_address}")
+            access_logger.debug('connection opened', client=self.client_address)
 
             clt = ProcessTheClient(self.connection, self.client_address)
             clt.start()
@@ -58,6 +62,10 @@ class Server(threading.Thread):
 
 
 def main():
+    cmd_parser = argparse.ArgumentParser(description='File Server')
+    access_logger.add_arguments(cmd_parser)
+    access_logger.configure_from_args(cmd_parser.parse_args())
+    profiling_hook.install()
     svr = Server(ipaddress='0.0.0.0',port=7778)
     svr.start()
 
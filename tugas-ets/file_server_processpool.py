@@ -1,15 +1,20 @@
 from socket import *
 import socket
+import os
 import logging
-from file_protocol import FileProtocol
+from file_protocol import FileProtocol, RESPONSE_TERMINATOR
+from socket_buffers import send_buffers
+from profiling_hook import ProfilingHook
+from access_log import access_logger
 import multiprocessing
 import concurrent.futures
 
 protocol_handler = FileProtocol()
+profiling_hook = ProfilingHook('file_server_processpool')
 
 def process_client_request(client_conn, client_addr):
     """Function to handle client requests"""
-    logging.warning(f"handling connection from {client_addr}")
+    access_logger.debug('connection opened', client=client_addr)
     msg_buffer = ""
     try:
         while True:
@@ -19,13 +24,15 @@ def process_client_request(client_conn, client_addr):
             msg_buffer += incoming_data.decode()
             while "\r\n\r\n" in msg_buffer:
                 request_cmd, msg_buffer = msg_buffer.split("\r\n\r\n", 1)
-                processed_result = protocol_handler.proses_string(request_cmd)
-                server_response = processed_result + "\r\n\r\n"
-                client_conn.sendall(server_response.encode())
+                if profiling_hook.active:
+                    processed_result = profiling_hook.run(protocol_handler.proses_buffers, request_cmd, client_addr)
+                else:
+                    processed_result = protocol_handler.proses_buffers(request_cmd, client_addr)
+                send_buffers(client_conn, processed_result + [RESPONSE_TERMINATOR])
     except Exception as ex:
-        logging.warning(f"Error: {str(ex)}")
+        access_logger.error('connection failed', client=client_addr, error=str(ex))
     finally:
-        logging.warning(f"connection from {client_addr} closed")
+        access_logger.debug('connection closed', client=client_addr)
         client_conn.close()
 
 
@@ -42,12 +49,14 @@ class FileServer:
         self.server_socket.listen(1)
         
         # Create a ProcessPoolExecutor
-        with concurrent.futures.ProcessPoolExecutor(max_workers=self.pool_workers) as proc_executor:
+        # worker process memakai setting access log yang sama (juga jika start method-nya bukan fork)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.pool_workers, initializer=access_logger.configure,
+                                                    initargs=access_logger.settings()) as proc_executor:
+            # worker di-fork setelah ini sehingga mewarisi handler, parent meneruskan sinyal ke semua worker
+            profiling_hook.install(forward_to=lambda: list(proc_executor._processes or {}))
             try:
                 while True:
                     client_conn, client_addr = self.server_socket.accept()
-                    logging.warning(f"connection from {client_addr}")
-                    
                     # Submit the client handling task to the process pool
                     proc_executor.submit(process_client_request, client_conn, client_addr)
             except KeyboardInterrupt:
@@ -64,7 +73,17 @@ def run_main():
     cmd_parser = argparse.ArgumentParser(description='File Server')
     cmd_parser.add_argument('--port', type=int, default=7778, help='Server port (default: 7778)')
     cmd_parser.add_argument('--pool-size', type=int, default=5, help='Process pool size (default: 5)')
+    cmd_parser.add_argument('--profile-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'),
+                            help='Output directory for SIGUSR1/SIGUSR2 captures (default: ./profiles)')
+    cmd_parser.add_argument('--profile-seconds', type=float, default=30, help='Stop a capture after N seconds (default: 30)')
+    cmd_parser.add_argument('--profile-requests', type=int, default=None, help='Stop a capture after N requests')
+    access_logger.add_arguments(cmd_parser)
     cmd_args = cmd_parser.parse_args()
+    access_logger.configure_from_args(cmd_args)
+
+    profiling_hook.output_dir = cmd_args.profile_dir
+    profiling_hook.duration = cmd_args.profile_seconds
+    profiling_hook.max_requests = cmd_args.profile_requests
     
     file_server = FileServer(bind_ip='0.0.0.0', bind_port=cmd_args.port, worker_pool_size=cmd_args.pool_size)
     file_server.start_server()
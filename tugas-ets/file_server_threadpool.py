@@ -1,15 +1,20 @@
 from socket import *
 import socket
+import os
 import logging
-from file_protocol import FileProtocol
+from file_protocol import FileProtocol, RESPONSE_TERMINATOR
+from socket_buffers import send_buffers
+from profiling_hook import ProfilingHook
+from access_log import access_logger
 import concurrent.futures
 import sys
 
 protocol_handler = FileProtocol()
+profiling_hook = ProfilingHook('file_server_threadpool')
 
 def process_client_request(client_conn, client_addr):
     """Function to handle client requests"""
-    logging.warning(f"handling connection from {client_addr}")
+    access_logger.debug('connection opened', client=client_addr)
     msg_buffer = ""
     try:
         # Increase socket timeout for large file transfers
@@ -23,13 +28,15 @@ def process_client_request(client_conn, client_addr):
             msg_buffer += incoming_data.decode()
             while "\r\n\r\n" in msg_buffer:
                 request_cmd, msg_buffer = msg_buffer.split("\r\n\r\n", 1)
-                processed_result = protocol_handler.proses_string(request_cmd)
-                server_response = processed_result + "\r\n\r\n"
-                client_conn.sendall(server_response.encode())
+                if profiling_hook.active:
+                    processed_result = profiling_hook.run(protocol_handler.proses_buffers, request_cmd, client_addr)
+                else:
+                    processed_result = protocol_handler.proses_buffers(request_cmd, client_addr)
+                send_buffers(client_conn, processed_result + [RESPONSE_TERMINATOR])
     except Exception as ex:
-        logging.warning(f"Error: {str(ex)}")
+        access_logger.error('connection failed', client=client_addr, error=str(ex))
     finally:
-        logging.warning(f"connection from {client_addr} closed")
+        access_logger.debug('connection closed', client=client_addr)
         client_conn.close()
 
 
@@ -48,13 +55,13 @@ class FileServer:
         self.server_socket.bind(self.server_addr)
         self.server_socket.listen(5)  # Increased backlog
         
+        profiling_hook.install()
+
         # Create a ThreadPoolExecutor
         with concurrent.futures.ThreadPoolExecutor(max_workers=self.pool_workers) as thread_executor:
             try:
                 while True:
                     client_conn, client_addr = self.server_socket.accept()
-                    logging.warning(f"connection from {client_addr}")
-                    
                     # Submit the client handling task to the thread pool
                     thread_executor.submit(process_client_request, client_conn, client_addr)
             except KeyboardInterrupt:
@@ -70,7 +77,17 @@ def run_main():
     cmd_parser = argparse.ArgumentParser(description='File Server')
     cmd_parser.add_argument('--port', type=int, default=7778, help='Server port (default: 7778)')
     cmd_parser.add_argument('--pool-size', type=int, default=5, help='Thread pool size (default: 5)')
+    cmd_parser.add_argument('--profile-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'),
+                            help='Output directory for SIGUSR1/SIGUSR2 captures (default: ./profiles)')
+    cmd_parser.add_argument('--profile-seconds', type=float, default=30, help='Stop a capture after N seconds (default: 30)')
+    cmd_parser.add_argument('--profile-requests', type=int, default=None, help='Stop a capture after N requests')
+    access_logger.add_arguments(cmd_parser)
     cmd_args = cmd_parser.parse_args()
+    access_logger.configure_from_args(cmd_args)
+
+    profiling_hook.output_dir = cmd_args.profile_dir
+    profiling_hook.duration = cmd_args.profile_seconds
+    profiling_hook.max_requests = cmd_args.profile_requests
     
     file_server = FileServer(bind_ip='0.0.0.0', bind_port=cmd_args.port, worker_pool_size=cmd_args.pool_size)
     file_server.start_server()
@@ -14,6 +14,8 @@ from collections import defaultdict
 import statistics
 import csv
 
+from server_resource_sampler import ServerResourceSampler, SUMMARY_FIELDS, find_pid_by_port
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,24 +26,36 @@ logging.basicConfig(
     ]
 )
 
+def decode_chunked_body(data):
+    """Decode a Transfer-Encoding: chunked body, None if the terminating chunk is missing"""
+    decoded = []
+    pos = 0
+    while True:
+        line_end = data.find(b"\r\n", pos)
+        if line_end < 0:
+            return None
+        chunk_size = int(data[pos:line_end].split(b";", 1)[0].strip(), 16)
+        if chunk_size == 0:
+            return b"".join(decoded)
+        chunk_start = line_end + 2
+        if len(data) < chunk_start + chunk_size:
+            return None
+        decoded.append(data[chunk_start:chunk_start + chunk_size])
+        pos = chunk_start + chunk_size + 2
+
 class StressTestRunner:
-    def __init__(self, target_server=('localhost', 7778)):
+    protocol = 'file'
+    server_model = None
+    supported_operations = ['upload', 'download', 'list']
+
+    def __init__(self, target_server=('localhost', 7778), sample_resources=False, server_pid=None, sample_interval=0.5):
         self.target_server = target_server
-        self.test_results = {
-            'upload': [],
-            'download': [],
-            'list': []
-        }
-        self.operation_success = {
-            'upload': 0,
-            'download': 0,
-            'list': 0
-        }
-        self.operation_failures = {
-            'upload': 0,
-            'download': 0,
-            'list': 0
-        }
+        self.sample_resources = sample_resources
+        self.server_pid = server_pid
+        self.resource_sampler = None
+        if sample_resources:
+            self.resource_sampler = ServerResourceSampler(server_pid, sample_interval)
+        self.clear_counters()
         
         # Create test files directory if it doesn't exist
         if not os.path.exists('test_files'):
@@ -277,27 +291,32 @@ class StressTestRunner:
 
     def clear_counters(self):
         """Reset success and fail counters"""
-        self.operation_success = {
-            'upload': 0,
-            'download': 0,
-            'list': 0
-        }
-        self.operation_failures = {
-            'upload': 0,
-            'download': 0,
-            'list': 0
-        }
-        self.test_results = {
-            'upload': [],
-            'download': [],
-            'list': []
-        }
+        self.operation_success = {operation: 0 for operation in self.supported_operations}
+        self.operation_failures = {operation: 0 for operation in self.supported_operations}
+        self.test_results = {operation: [] for operation in self.supported_operations}
+
+    def __getstate__(self):
+        # The sampler owns a thread, process pool workers don't need it
+        state = self.__dict__.copy()
+        state['resource_sampler'] = None
+        return state
+
+    def resolve_server_pid(self):
+        """Find the server pid again, e.g. after the server was restarted"""
+        if not self.resource_sampler:
+            return
+        server_pid = self.server_pid or find_pid_by_port(self.target_server[1])
+        if server_pid:
+            logging.info(f"Sampling resources of server pid {server_pid}")
+        else:
+            logging.warning(f"No local process is listening on port {self.target_server[1]}, resource sampling disabled")
+        self.resource_sampler.server_pid = server_pid
 
     def execute_stress_test(self, test_operation, file_size_mb, worker_pool_size, pool_type='thread'):
         """Run a stress test with specified parameters"""
         self.clear_counters()
         
-        if test_operation not in ['upload', 'download', 'list']:
+        if test_operation not in self.supported_operations:
             logging.error(f"Invalid operation: {test_operation}")
             return
             
@@ -305,7 +324,7 @@ class StressTestRunner:
         
         # Generate test file if needed for upload tests
         target_test_file = None
-        if test_operation == 'upload' or test_operation == 'download':
+        if test_operation in ('upload', 'download', 'delete'):
             target_test_file = self.create_test_file(file_size_mb)
         
         # First, ensure file exists on server for download tests
@@ -324,6 +343,12 @@ class StressTestRunner:
         
         # Run the stress test
         collected_results = []
+
+        resource_summary = {}
+        sampling = False
+        if self.resource_sampler and self.resource_sampler.server_pid:
+            cell_label = f"{test_operation}-{file_size_mb}MB-{worker_pool_size}{pool_type}"
+            sampling = self.resource_sampler.start(cell_label)
         
         with executor_class(max_workers=worker_pool_size) as work_executor:
             submitted_futures = []
@@ -334,6 +359,8 @@ class StressTestRunner:
                 elif test_operation == 'download':
                     test_file_name = os.path.basename(target_test_file)
                     submitted_futures.append(work_executor.submit(self.execute_download, test_file_name, worker_idx))
+                elif test_operation == 'delete':
+                    submitted_futures.append(work_executor.submit(self.execute_delete, target_test_file, worker_idx))
                 else:  # list
                     submitted_futures.append(work_executor.submit(self.execute_list_files, worker_idx))
             
@@ -344,6 +371,12 @@ class StressTestRunner:
                     self.test_results[test_operation].append(future_result)
                 except Exception as future_ex:
                     logging.error(f"Worker failed with exception: {str(future_ex)}")
+
+        if sampling:
+            resource_summary = {f"server_{key}": value for key, value in self.resource_sampler.stop().items()}
+            logging.info(f"Server resources: peak CPU {resource_summary.get('server_peak_cpu_percent', 0)}%, "
+                         f"peak RSS {resource_summary.get('server_peak_rss_mb', 0)} MB, "
+                         f"peak threads {resource_summary.get('server_peak_threads', 0)}")
         
         # Calculate statistics
         success_durations = [r['duration'] for r in collected_results if r['status'] == 'OK']
@@ -352,15 +385,20 @@ class StressTestRunner:
         if not success_durations:
             logging.warning("No successful operations to calculate statistics")
             return {
+                'protocol': self.protocol,
+                'server_model': self.server_model,
                 'operation': test_operation,
                 'file_size_mb': file_size_mb,
                 'client_pool_size': worker_pool_size,
                 'executor_type': pool_type,
                 'success_count': self.operation_success[test_operation],
-                'fail_count': self.operation_failures[test_operation]
+                'fail_count': self.operation_failures[test_operation],
+                **resource_summary
             }
         
         calculated_stats = {
+            'protocol': self.protocol,
+            'server_model': self.server_model,
             'operation': test_operation,
             'file_size_mb': file_size_mb,
             'client_pool_size': worker_pool_size,
@@ -374,7 +412,8 @@ class StressTestRunner:
             'min_throughput': min(success_throughputs) if success_throughputs else 0,
             'max_throughput': max(success_throughputs) if success_throughputs else 0,
             'success_count': self.operation_success[test_operation],
-            'fail_count': self.operation_failures[test_operation]
+            'fail_count': self.operation_failures[test_operation],
+            **resource_summary
         }
         
         logging.info(f"Test complete: {calculated_stats['success_count']} succeeded, {calculated_stats['fail_count']} failed")
@@ -391,6 +430,7 @@ class StressTestRunner:
             logging.info(f"Tests for server pool size: {server_pool_size}")
             logging.info("Please restart the server with the appropriate pool size!")
             input("Press Enter when the server is ready...")
+            self.resolve_server_pid()
             
             for executor_type in test_executor_types:
                 for operation in test_operations:
@@ -411,11 +451,13 @@ class StressTestRunner:
         
         with open(output_csv_file, 'w', newline='') as csv_file:
             csv_headers = [
-                'operation', 'file_size_mb', 'client_pool_size', 'server_pool_size', 'executor_type',
+                'protocol', 'server_model', 'operation', 'file_size_mb', 'client_pool_size', 'server_pool_size', 'executor_type',
                 'avg_duration', 'median_duration', 'min_duration', 'max_duration',
                 'avg_throughput', 'median_throughput', 'min_throughput', 'max_throughput',
                 'success_count', 'fail_count'
             ]
+            if self.resource_sampler:
+                csv_headers += [f"server_{field}" for field in SUMMARY_FIELDS]
             csv_writer = csv.DictWriter(csv_file, fieldnames=csv_headers)
             
             csv_writer.writeheader()
@@ -423,14 +465,179 @@ class StressTestRunner:
                 csv_writer.writerow(stats_data)
         
         logging.info(f"Results saved to {output_csv_file}")
+
+        if self.resource_sampler and self.resource_sampler.samples:
+            self.resource_sampler.export_samples_to_csv(output_csv_file.replace('.csv', '_resources.csv'))
         return output_csv_file
 
+class HttpStressTestRunner(StressTestRunner):
+    """Same test matrix against the tugas-4 HTTP servers (thread pool :8885, process pool :8889, asyncio :8887)"""
+    protocol = 'http'
+    supported_operations = ['upload', 'download', 'list', 'delete']
+    server_ports = {'thread': 8885, 'process': 8889, 'asyncio': 8887}
+
+    def transmit_http_request(self, method, path, extra_headers=None, upload_path=None, save_path=None):
+        """Send one HTTP request and read the whole response, streaming file bodies in both directions"""
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client_socket.settimeout(600)
+        try:
+            client_socket.connect(self.target_server)
+
+            request_headers = {'Host': f"{self.target_server[0]}:{self.target_server[1]}", 'Connection': 'close'}
+            request_headers.update(extra_headers or {})
+            if upload_path:
+                request_headers['Content-Length'] = str(os.path.getsize(upload_path))
+                request_headers['Content-Type'] = 'application/octet-stream'
+            request_head = f"{method} {path} HTTP/1.1\r\n"
+            request_head += ''.join(f"{key}: {value}\r\n" for key, value in request_headers.items())
+            client_socket.sendall((request_head + "\r\n").encode())
+
+            if upload_path:
+                with open(upload_path, 'rb') as file_reader:
+                    client_socket.sendfile(file_reader)
+
+            response_data = b""
+            while b"\r\n\r\n" not in response_data:
+                recv_data = client_socket.recv(65536)
+                if not recv_data:
+                    return {'status': 'ERROR', 'data': 'Connection closed before response headers'}
+                response_data += recv_data
+
+            head, body = response_data.split(b"\r\n\r\n", 1)
+            head_lines = head.decode('iso-8859-1').split("\r\n")
+            status_code = int(head_lines[0].split(" ", 2)[1])
+            response_headers = {}
+            for line in head_lines[1:]:
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    response_headers[key.strip().lower()] = value.strip()
+
+            chunked = response_headers.get('transfer-encoding', '').lower() == 'chunked'
+            content_length = int(response_headers['content-length']) if 'content-length' in response_headers else None
+            if chunked:
+                content_length = None
+            body_size = 0
+            body_chunks = []
+            # body chunked dikumpulkan dulu lalu di-decode, baru ditulis ke file
+            file_writer = open(save_path, 'wb') if save_path and status_code == 200 and not chunked else None
+            try:
+                while True:
+                    if body:
+                        body_size += len(body)
+                        if file_writer:
+                            file_writer.write(body)
+                        else:
+                            body_chunks.append(body)
+                    if content_length is not None and body_size >= content_length:
+                        break
+                    body = client_socket.recv(1024*1024)
+                    if not body:
+                        break
+            finally:
+                if file_writer:
+                    file_writer.close()
+
+            if content_length is not None and body_size < content_length:
+                return {'status': 'ERROR', 'data': f'Incomplete body: {body_size} of {content_length} bytes'}
+
+            if chunked:
+                decoded = decode_chunked_body(b"".join(body_chunks))
+                if decoded is None:
+                    return {'status': 'ERROR', 'data': 'Incomplete chunked body'}
+                body_size = len(decoded)
+                body_chunks = [decoded]
+                if save_path and status_code == 200:
+                    with open(save_path, 'wb') as fp:
+                        fp.write(decoded)
+                    body_chunks = []
+
+            return {
+                'status': 'OK' if 200 <= status_code < 300 else 'ERROR',
+                'status_code': status_code,
+                'body_size': body_size,
+                'data': b"".join(body_chunks).decode('utf-8', errors='replace')
+            }
+        except socket.timeout as timeout_ex:
+            logging.error(f"Socket timeout: {str(timeout_ex)}")
+            return {'status': 'ERROR', 'data': f'Socket timeout: {str(timeout_ex)}'}
+        except ConnectionRefusedError:
+            logging.error("Connection refused. Is the server running?")
+            return {'status': 'ERROR', 'data': 'Connection refused. Is the server running?'}
+        except Exception as general_ex:
+            logging.error(f"Error in transmit_http_request: {str(general_ex)}")
+            return {'status': 'ERROR', 'data': str(general_ex)}
+        finally:
+            client_socket.close()
+
+    def timed_http_operation(self, operation, worker_num, file_size, method, path, **request_args):
+        """Run one HTTP request and build the same result record as the file protocol runner"""
+        operation_start = time.time()
+        cmd_result = self.transmit_http_request(method, path, **request_args)
+        operation_time = time.time() - operation_start
+
+        if operation == 'download':
+            file_size = cmd_result.get('body_size', 0)
+        data_rate = file_size / operation_time if operation_time > 0 and file_size else 0
+
+        if cmd_result['status'] == 'OK':
+            logging.info(f"Worker {worker_num}: {operation} {path} successful ({file_size/1024/1024:.2f} MB) in {operation_time:.2f}s - {data_rate/1024/1024:.2f} MB/s")
+            self.operation_success[operation] += 1
+        else:
+            logging.error(f"Worker {worker_num}: {operation} {path} failed: {cmd_result.get('status_code', '')} {cmd_result['data'].strip()}")
+            self.operation_failures[operation] += 1
+
+        result = {
+            'worker_id': worker_num,
+            'operation': operation,
+            'file_size': file_size,
+            'duration': operation_time,
+            'throughput': data_rate if cmd_result['status'] == 'OK' else 0,
+            'status': cmd_result['status']
+        }
+        if cmd_result['status'] != 'OK':
+            result['error'] = cmd_result['data']
+        return result
+
+    def execute_upload(self, target_file_path, worker_num, remote_filename=None):
+        """POST /upload with X-Filename, body streamed from the test file"""
+        remote_filename = remote_filename or os.path.basename(target_file_path)
+        return self.timed_http_operation('upload', worker_num, os.path.getsize(target_file_path), 'POST', '/upload',
+                                         extra_headers={'X-Filename': remote_filename}, upload_path=target_file_path)
+
+    def execute_download(self, target_filename, worker_num):
+        """GET the static file and save it to the downloads folder"""
+        save_path = os.path.join('downloads', f"worker{worker_num}_{target_filename}")
+        return self.timed_http_operation('download', worker_num, 0, 'GET', f"/{target_filename}", save_path=save_path)
+
+    def execute_list_files(self, worker_num):
+        """GET /list"""
+        return self.timed_http_operation('list', worker_num, 0, 'GET', '/list')
+
+    def execute_delete(self, target_file_path, worker_num):
+        """Upload a per-worker copy (not timed) then time DELETE /delete/<name>"""
+        remote_filename = f"delete_worker{worker_num}_{os.path.basename(target_file_path)}"
+        setup_result = self.transmit_http_request('POST', '/upload', extra_headers={'X-Filename': remote_filename},
+                                                  upload_path=target_file_path)
+        if setup_result['status'] != 'OK':
+            logging.error(f"Worker {worker_num}: Failed to upload {remote_filename} for delete test: {setup_result['data']}")
+            self.operation_failures['delete'] += 1
+            return {'worker_id': worker_num, 'operation': 'delete', 'file_size': 0, 'duration': 0,
+                    'throughput': 0, 'status': 'ERROR', 'error': setup_result['data']}
+        return self.timed_http_operation('delete', worker_num, 0, 'DELETE', f"/delete/{remote_filename}")
+
 if __name__ == "__main__":
     cmd_parser = argparse.ArgumentParser(description='File Server Stress Test Client')
     cmd_parser.add_argument('--host', default='localhost', help='Server host (default: localhost)')
-    cmd_parser.add_argument('--port', type=int, default=7778, help='Server port (default: 7778)')
-    cmd_parser.add_argument('--operation', choices=['upload', 'download', 'list', 'all'], default='all', 
-                        help='Operation to test (default: all)')
+    cmd_parser.add_argument('--port', type=int, default=None,
+                        help='Server port (default: 7778 for file, for http the port of --server-model)')
+    cmd_parser.add_argument('--protocol', choices=['file', 'http'], default='file',
+                        help='file = JSON/base64 file server, http = tugas-4 HTTP servers (default: file)')
+    cmd_parser.add_argument('--server-model', choices=sorted(HttpStressTestRunner.server_ports), default='thread',
+                        help='HTTP server under test: thread (server_thread_pool_http.py :8885), process '
+                             '(server_process_pool_http.py :8889) or asyncio (server_asyncio_http.py :8887), '
+                             'recorded in the results (default: thread)')
+    cmd_parser.add_argument('--operation', choices=['upload', 'download', 'list', 'delete', 'all'], default='all', 
+                        help='Operation to test, delete is http only (default: all)')
     cmd_parser.add_argument('--file-sizes', type=int, nargs='+', default=[10, 50, 100], 
                         help='File sizes in MB (default: 10 50 100)')
     cmd_parser.add_argument('--client-pools', type=int, nargs='+', default=[1, 5, 10], 
@@ -439,6 +646,12 @@ if __name__ == "__main__":
                         help='Server worker pool sizes to test against (default: 1 5 10)')
     cmd_parser.add_argument('--executor', choices=['thread', 'process', 'both'], default='thread', 
                         help='Executor type (default: thread)')
+    cmd_parser.add_argument('--sample-resources', action='store_true',
+                        help='Sample CPU/RSS/threads/FDs/context switches/IO of the server process tree from /proc')
+    cmd_parser.add_argument('--server-pid', type=int, default=None,
+                        help='Server pid to sample (default: process listening on --port)')
+    cmd_parser.add_argument('--sample-interval', type=float, default=0.5,
+                        help='Resource sampling interval in seconds (default: 0.5)')
     cmd_parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     
     parsed_args = cmd_parser.parse_args()
@@ -457,17 +670,32 @@ if __name__ == "__main__":
     else:
         test_executor_types = [parsed_args.executor]
         
+    if parsed_args.protocol == 'http':
+        runner_class = HttpStressTestRunner
+        target_port = parsed_args.port or runner_class.server_ports[parsed_args.server_model]
+    else:
+        runner_class = StressTestRunner
+        target_port = parsed_args.port or 7778
+
     if parsed_args.operation == 'all':
         test_operations = ['list', 'download', 'upload']
+        if parsed_args.protocol == 'http':
+            test_operations.append('delete')
+    elif parsed_args.operation not in runner_class.supported_operations:
+        cmd_parser.error(f"operation {parsed_args.operation} is not supported by the {parsed_args.protocol} protocol")
     else:
         test_operations = [parsed_args.operation]
     
     # Create and run stress test client
-    stress_tester = StressTestRunner((parsed_args.host, parsed_args.port))
+    stress_tester = runner_class((parsed_args.host, target_port), parsed_args.sample_resources,
+                                  parsed_args.server_pid, parsed_args.sample_interval)
+    if parsed_args.protocol == 'http':
+        stress_tester.server_model = parsed_args.server_model
     
     # Run a single test if specific parameters are provided
     if len(test_operations) == 1 and len(test_file_sizes) == 1 and len(test_client_pools) == 1 and len(test_server_pools) == 1:
         logging.info(f"Running a single test with operation={test_operations[0]}, file_size={test_file_sizes[0]}MB, client_pool={test_client_pools[0]}")
+        stress_tester.resolve_server_pid()
         single_test_stats = stress_tester.execute_stress_test(test_operations[0], test_file_sizes[0], test_client_pools[0], test_executor_types[0])
         if single_test_stats:
             single_test_stats['server_pool_size'] = test_server_pools[0]
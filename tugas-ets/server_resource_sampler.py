@@ -0,0 +1,291 @@
+import os
+import time
+import threading
+import logging
+import csv
+
+"""
+* ServerResourceSampler membaca /proc secara periodik untuk proses server
+beserta seluruh child process-nya (worker process pool), sehingga setiap
+sel pada matriks stress test punya data CPU, memori, thread, FD,
+context switch dan I/O
+
+* hanya berjalan di Linux (membutuhkan /proc)
+"""
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+SAMPLE_FIELDS = [
+    'cell', 'timestamp', 'elapsed', 'processes', 'cpu_percent', 'cpu_user_s', 'cpu_sys_s',
+    'rss_mb', 'threads', 'fds', 'ctx_voluntary', 'ctx_involuntary', 'read_bytes', 'write_bytes'
+]
+
+SUMMARY_FIELDS = [
+    'peak_cpu_percent', 'avg_cpu_percent', 'cpu_user_s', 'cpu_sys_s',
+    'peak_rss_mb', 'avg_rss_mb', 'peak_threads', 'avg_threads', 'peak_fds', 'avg_fds',
+    'ctx_voluntary', 'ctx_involuntary', 'read_bytes', 'write_bytes'
+]
+
+
+def find_pid_by_port(port):
+    """Find the pid of the process listening on a local TCP port"""
+    inodes = set()
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as fp:
+                next(fp)
+                for line in fp:
+                    fields = line.split()
+                    local_port = int(fields[1].rsplit(':', 1)[1], 16)
+                    # state 0A = LISTEN
+                    if local_port == port and fields[3] == '0A':
+                        inodes.add(fields[9])
+        except OSError:
+            continue
+
+    if not inodes:
+        return None
+
+    targets = {f"socket:[{inode}]" for inode in inodes}
+    owners = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        fd_dir = f"/proc/{entry}/fd"
+        try:
+            for fd in os.listdir(fd_dir):
+                if os.readlink(os.path.join(fd_dir, fd)) in targets:
+                    owners.append(int(entry))
+                    break
+        except OSError:
+            continue
+
+    if not owners:
+        return None
+    # worker process pool mewarisi socket listen dari parent, worker SO_REUSEPORT membuka
+    # socket sendiri (parent tidak memegang socket): server root adalah leluhur bersama semua owner
+    root = common_ancestor(owners)
+    # dengan satu worker ownernya hanya worker itu sendiri: naik selama parent menjalankan
+    # program yang sama (worker hasil fork punya cmdline yang sama dengan server root)
+    while True:
+        parent = parent_pid(root)
+        if parent <= 1 or process_cmdline(parent) != process_cmdline(root):
+            return root
+        root = parent
+
+
+def parent_pid(pid):
+    try:
+        with open(f"/proc/{pid}/status") as fp:
+            for line in fp:
+                if line.startswith('PPid:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def process_cmdline(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", 'rb') as fp:
+            return fp.read()
+    except OSError:
+        return None
+
+
+def ancestors(pid):
+    """pid followed by its parent, grandparent, ... up to init"""
+    chain = []
+    while pid > 0 and pid not in chain:
+        chain.append(pid)
+        pid = parent_pid(pid)
+    return chain
+
+
+def common_ancestor(pids):
+    """Nearest process whose tree contains every pid in pids"""
+    chains = [ancestors(pid) for pid in pids]
+    others = [set(chain) for chain in chains[1:]]
+    for pid in chains[0]:
+        if all(pid in chain for chain in others):
+            # owner yang tidak berhubungan (bertemu di init) bukan satu server
+            return pid if pid > 1 else min(pids)
+    return min(pids)
+
+
+def list_process_tree(pid):
+    """Return pid and all of its descendants"""
+    pids = [pid]
+    index = 0
+    while index < len(pids):
+        current = pids[index]
+        index += 1
+        try:
+            for tid in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{tid}/children") as fp:
+                    pids.extend(int(child) for child in fp.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def read_process_counters(pid):
+    """Read the raw counters of a single process, None if it is gone"""
+    try:
+        with open(f"/proc/{pid}/stat") as fp:
+            # the command name may contain spaces, fields start after the last ')'
+            stat_fields = fp.read().rsplit(')', 1)[1].split()
+        counters = {
+            'utime': int(stat_fields[11]),
+            'stime': int(stat_fields[12]),
+            'rss_bytes': int(stat_fields[21]) * PAGE_SIZE,
+            'threads': int(stat_fields[17]),
+            'ctx_voluntary': 0,
+            'ctx_involuntary': 0,
+            'read_bytes': 0,
+            'write_bytes': 0,
+        }
+
+        with open(f"/proc/{pid}/status") as fp:
+            for line in fp:
+                if line.startswith('voluntary_ctxt_switches:'):
+                    counters['ctx_voluntary'] = int(line.split()[1])
+                elif line.startswith('nonvoluntary_ctxt_switches:'):
+                    counters['ctx_involuntary'] = int(line.split()[1])
+
+        counters['fds'] = len(os.listdir(f"/proc/{pid}/fd"))
+    except (OSError, IndexError, ValueError):
+        return None
+
+    try:
+        # rchar/wchar include socket traffic, read_bytes/write_bytes only count the block layer
+        with open(f"/proc/{pid}/io") as fp:
+            for line in fp:
+                key, value = line.split(':', 1)
+                if key == 'rchar':
+                    counters['read_bytes'] = int(value)
+                elif key == 'wchar':
+                    counters['write_bytes'] = int(value)
+    except OSError:
+        pass
+
+    return counters
+
+
+class ServerResourceSampler:
+    CUMULATIVE = ('utime', 'stime', 'ctx_voluntary', 'ctx_involuntary', 'read_bytes', 'write_bytes')
+
+    def __init__(self, server_pid, interval=0.5):
+        self.server_pid = server_pid
+        self.interval = interval
+        self.samples = []
+        self.cell_samples = []
+        self.cell_label = ''
+        self.stop_event = threading.Event()
+        self.sampler_thread = None
+        self.last_counters = {}
+        self.cell_totals = {}
+
+    def take_sample(self, now, last_time):
+        """Aggregate one sample over the whole server process tree"""
+        current = {}
+        for pid in list_process_tree(self.server_pid):
+            counters = read_process_counters(pid)
+            if counters:
+                current[pid] = counters
+
+        # deltas are computed per pid so that a worker exiting mid-cell doesn't make totals go backwards
+        delta = dict.fromkeys(self.CUMULATIVE, 0)
+        for pid, counters in current.items():
+            previous = self.last_counters.get(pid)
+            for key in self.CUMULATIVE:
+                delta[key] += counters[key] - previous[key] if previous else 0
+        self.last_counters = current
+
+        for key in self.CUMULATIVE:
+            self.cell_totals[key] = self.cell_totals.get(key, 0) + delta[key]
+
+        wall = now - last_time
+        cpu_seconds = (delta['utime'] + delta['stime']) / CLOCK_TICKS
+        return {
+            'cell': self.cell_label,
+            'timestamp': round(now, 3),
+            'elapsed': round(now - self.cell_start, 3),
+            'processes': len(current),
+            'cpu_percent': round(cpu_seconds / wall * 100, 2) if wall > 0 else 0,
+            'cpu_user_s': round(self.cell_totals['utime'] / CLOCK_TICKS, 3),
+            'cpu_sys_s': round(self.cell_totals['stime'] / CLOCK_TICKS, 3),
+            'rss_mb': round(sum(c['rss_bytes'] for c in current.values()) / 1024 / 1024, 2),
+            'threads': sum(c['threads'] for c in current.values()),
+            'fds': sum(c['fds'] for c in current.values()),
+            'ctx_voluntary': self.cell_totals['ctx_voluntary'],
+            'ctx_involuntary': self.cell_totals['ctx_involuntary'],
+            'read_bytes': self.cell_totals['read_bytes'],
+            'write_bytes': self.cell_totals['write_bytes'],
+        }
+
+    def sampling_loop(self):
+        last_time = time.time()
+        while not self.stop_event.wait(self.interval):
+            now = time.time()
+            sample = self.take_sample(now, last_time)
+            last_time = now
+            self.cell_samples.append(sample)
+
+        # always record the state at the end of the cell, even for cells shorter than one interval
+        self.cell_samples.append(self.take_sample(time.time(), last_time))
+
+    def start(self, cell_label):
+        """Start sampling for one cell of the test matrix"""
+        if not os.path.exists(f"/proc/{self.server_pid}"):
+            logging.warning(f"Server pid {self.server_pid} not found, resource sampling disabled for this cell")
+            return False
+
+        self.cell_label = cell_label
+        self.cell_samples = []
+        self.cell_totals = {}
+        self.cell_start = time.time()
+        self.last_counters = {}
+        self.take_sample(self.cell_start, self.cell_start)  # baseline for the deltas
+        self.stop_event.clear()
+        self.sampler_thread = threading.Thread(target=self.sampling_loop, daemon=True)
+        self.sampler_thread.start()
+        return True
+
+    def stop(self):
+        """Stop sampling and return the peak/average summary of the cell"""
+        if not self.sampler_thread:
+            return {}
+        self.stop_event.set()
+        self.sampler_thread.join()
+        self.sampler_thread = None
+        self.samples.extend(self.cell_samples)
+
+        if not self.cell_samples:
+            return {}
+
+        last = self.cell_samples[-1]
+        summary = {
+            'cpu_user_s': last['cpu_user_s'],
+            'cpu_sys_s': last['cpu_sys_s'],
+            'ctx_voluntary': last['ctx_voluntary'],
+            'ctx_involuntary': last['ctx_involuntary'],
+            'read_bytes': last['read_bytes'],
+            'write_bytes': last['write_bytes'],
+        }
+        for key in ('cpu_percent', 'rss_mb', 'threads', 'fds'):
+            values = [s[key] for s in self.cell_samples]
+            summary[f"peak_{key}"] = max(values)
+            summary[f"avg_{key}"] = round(sum(values) / len(values), 2)
+        return summary
+
+    def export_samples_to_csv(self, output_csv_file):
+        """Save the full time series of all cells"""
+        with open(output_csv_file, 'w', newline='') as csv_file:
+            csv_writer = csv.DictWriter(csv_file, fieldnames=SAMPLE_FIELDS)
+            csv_writer.writeheader()
+            for sample in self.samples:
+                csv_writer.writerow(sample)
+        logging.info(f"Resource samples saved to {output_csv_file}")
+        return output_csv_file
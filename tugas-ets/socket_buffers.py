@@ -0,0 +1,11 @@
+import os
+import sys
+
+"""
+* implementasi send_buffers (sendmsg scatter/gather) ada di common/socket_buffers.py
+(dipakai bersama tugas-4 dan tugas-ets), modul ini hanya meneruskan import
+"""
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.socket_buffers import *  # noqa: E402,F401,F403